@@ -1,8 +1,11 @@
 import pygame
 import math
 from functools import partial
+from collections import OrderedDict
 REFERENCE_FONT_SIZE = 20
 BASE_SCALE = (400, 800)
+# Rendered labels kept around between frames; least recently drawn ones are dropped first
+TEXT_CACHE_SIZE = 256
 
 
 class UI(object):
@@ -26,6 +29,11 @@ class UI(object):
         self.font_size = REFERENCE_FONT_SIZE
         self.x_scaler = 1
         self.y_scaler = 1
+        # Fonts by size and rendered text surfaces by (text, size, color)
+        self.fonts = {}
+        self.text_cache = OrderedDict()
+        # Frame profiler counting draw calls, set by the renderer
+        self.profiler = None
         for button in self.buttons:
             button.x += self.width
         self.next_turn_x = buttons[0].x - self.width # Assuming the first button is "next turn"
@@ -39,15 +47,38 @@ class UI(object):
             if location[0] >= button.x and location[0] <= button.x+button.width and location[1] >= button.y and location[1] <= button.y+button.height:
                 button.eventWhenClick()
 
+    def get_font(self):
+        font = self.fonts.get(self.font_size)
+        if font is None:
+            font = pygame.font.Font(None, self.font_size)
+            self.fonts[self.font_size] = font
+        return font
+
+    def render_text(self, write, color=(0, 0, 0)):
+        """Get the rendered surface for a label, rendering it only on a cache miss"""
+        key = (write, self.font_size, color)
+        text = self.text_cache.get(key)
+        if text is None:
+            text = self.get_font().render(write.encode('utf-8'), True, color)
+            self.text_cache[key] = text
+            if len(self.text_cache) > TEXT_CACHE_SIZE:
+                self.text_cache.popitem(last=False)
+        else:
+            self.text_cache.move_to_end(key)
+        return text
+
+    def clear_text_cache(self):
+        self.fonts = {}
+        self.text_cache.clear()
+
     def drawText(self, x, y, write):
-        font = pygame.font.Font(None, self.font_size)
-        text = font.render(write.encode('utf-8'), True, (0, 0, 0))
-        self.surface.blit(text, (x, y))
+        self.surface.blit(self.render_text(write), (x, y))
+        if self.profiler:
+            self.profiler.count('blits')
         # [ord(char) for char in text]
     
     def centerText(self, write, width, height):
-        font = pygame.font.Font(None, self.font_size)
-        textWidth, textHeight = font.size(write)
+        textWidth, textHeight = self.get_font().size(write)
         y = abs((height-textHeight)/2)
         x = abs((width-textWidth)/2)
         return x, y
@@ -238,6 +269,8 @@ class UI(object):
         # Use yellow for highlighted buttons, blue for normal
         button_color = (255, 200, 0) if button.is_highlighted else (0, 128, 255)
         pygame.draw.rect(self.surface, button_color, [button.getX(), button.getY(), button.getWidth(), button.getHeight()])
+        if self.profiler:
+            self.profiler.count('draws')
         x, y = self.centerText(button.getLabel(), button.getWidth(), button.getHeight())
         self.drawText(button.getX() + x, button.getY() + y, button.getLabel())
         
@@ -259,7 +292,10 @@ class UI(object):
         return int(REFERENCE_FONT_SIZE * self.y_scaler)
     
     def update_dimensions(self, width, height) -> None:
-        self.font_size = min(self.change_window_width(width), self.change_window_height(height))
+        font_size = min(self.change_window_width(width), self.change_window_height(height))
+        if font_size != self.font_size:
+            self.clear_text_cache()
+        self.font_size = font_size
         self.change_next_turn_button()
 
     def change_next_turn_button(self) -> None:
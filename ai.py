@@ -20,22 +20,33 @@ Enhanced heuristic rules:
     2. Fallback: pick cheapest affordable
 - After finishing actions, call `board.next_turn()` to end the AI's turn
 """
-import random
 import mines
+import seeding
+import game_log
+
+log = game_log.logger('ai')
 
 class HeuristicAI:
-    def __init__(self, player):
+    def __init__(self, player, rng=None, center_objectives=None):
         self.player = player
+        # Random stream for every choice the AI makes; seeded so games can be replayed
+        self.rng = rng if rng is not None else seeding.stream(seeding.DEFAULT_SEED, 'ai', player.getTeam())
         # Track unit production by cost tier for variety
         self.production_history = []
-        # Mine/objective coordinates
-        self.center_objectives = set(mines.mineCoords)
+        # Mine/objective coordinates, normally the board's mine_coords
+        self.center_objectives = set(mines.mineCoords if center_objectives is None else center_objectives)
+
+    def _get_enemy_player(self, board):
+        """The player this AI is playing against"""
+        if self.player is board.get_player_num(0):
+            return board.get_player_num(1)
+        return board.get_player_num(0)
 
     def _count_farms(self, board, player):
         """Count how many farms a player has"""
         farm_count = 0
         for unit in board.units_of_player(player):
-            if 'producer' in unit.getTags():
+            if unit.hasTag('producer'):
                 farm_count += 1
         return farm_count
 
@@ -60,9 +71,7 @@ class HeuristicAI:
                        if u.getPlayer() != self.player and not u.is_under_construction()]
         
         ai_farms = self._count_farms(board, self.player)
-        enemy_farms = self._count_farms(board, [e for e in board.get_units() 
-                                               if e.getPlayer() != self.player][0].getPlayer() 
-                                        if board.get_units() else self.player)
+        enemy_farms = self._count_farms(board, self._get_enemy_player(board))
         
         # Dire if very few combat units and no farms
         if len(ai_units) < 2 and ai_farms == 0:
@@ -129,7 +138,7 @@ class HeuristicAI:
         # Calculate total potential damage (each enemy deals max(1, attack - armor))
         total_damage = 0
         for enemy in enemies_that_can_attack:
-            bonus = enemy.getBonuses().bonusAgainst(unit)
+            bonus = enemy.multiplierAgainst(unit)
             base_damage = enemy.getAttack() * bonus
             damage_after_armor = max(1, base_damage - unit.getArmor())
             total_damage += damage_after_armor
@@ -211,7 +220,7 @@ class HeuristicAI:
             return -float('inf')
         
         # 1) Bonus multiplier (higher is better)
-        bonus = attacking_unit.getBonuses().bonusAgainst(target_unit)
+        bonus = attacking_unit.multiplierAgainst(target_unit)
         
         # 2) Fractional HP (lower is better, so negate)
         frac_hp = target_unit.getHp() / max(1, target_unit.getMaxHp())
@@ -268,7 +277,7 @@ class HeuristicAI:
         # Sort by count (pick underrepresented bracket)
         buckets.sort(key=lambda x: x[0])
         chosen_bucket = buckets[0][1]
-        chosen = random.choice(chosen_bucket)
+        chosen = self.rng.choice(chosen_bucket)
         
         self.production_history.append(chosen)
         return chosen
@@ -276,7 +285,7 @@ class HeuristicAI:
     def take_turn(self, board):
         """Execute one turn of AI actions"""
         units = list(board.units_of_player(self.player))
-        random.shuffle(units)
+        self.rng.shuffle(units)
         
         # Gather enemy units for analysis
         enemies = [e for e in board.get_units() if e.getPlayer() != self.player]
@@ -339,7 +348,7 @@ class HeuristicAI:
                 continue
 
             # Special handling for builders
-            if 'builder' in u.getTags():
+            if u.hasTag('builder'):
                 # Builders should attack first if they can
                 if u.canAttack():
                     attackable = board.attackable_tiles_from(tile)
@@ -350,7 +359,7 @@ class HeuristicAI:
                 
                 # Try to build farms if not in dire position and behind on farms
                 if should_build_farms and u.getAttacks() >= 1:
-                    safe_tiles = self._find_safe_build_location(tile, enemies)
+                    safe_tiles = self._find_safe_build_location(board, tile, enemies)
                     if safe_tiles:
                         # Try to build a farm
                         for safe_tile in safe_tiles:
@@ -359,7 +368,7 @@ class HeuristicAI:
                             if self.player.getMoney() >= farm_cost:
                                 # Place farm unit on the safe tile
                                 board.buy_unit(safe_tile.get_x(), safe_tile.get_y(), 'Farm.txt', 30)
-                                u.do_action()  # Consume the builder's action
+                                board.spend_action(tile)  # Consume the builder's action
                                 continue
                 
                 # If not building farms or can't, still move builders appropriately
@@ -422,7 +431,7 @@ class HeuristicAI:
                     continue
 
             # 3) Produce varied units from factories
-            if 'factory' in u.getTags():
+            if u.hasTag('factory'):
                 empty = board.empty_surrounding_tiles(tile.get_x(), tile.get_y())
                 if empty:
                     produceable = board.statreader.units_with_tag(f'produced by {u.getName()}')
@@ -436,4 +445,4 @@ class HeuristicAI:
         try:
             board.next_turn()
         except RecursionError:
-            print("AI aborted due to recursion depth")
+            log.warning("AI aborted due to recursion depth")
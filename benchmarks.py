@@ -0,0 +1,236 @@
+"""Benchmarks for the game model and engine
+
+Run with `python benchmarks.py`, or `python benchmarks.py --json results.json`
+to also save the results for comparing versions. The memory benchmark compares
+the slotted model classes against copies of the same classes that keep their
+attributes in a per-instance __dict__, which is how they were stored before.
+
+The engine benchmarks time board operations on randomly populated boards of
+each size and unit density. Boards are laid out from a fixed seed, so every
+run and every version measures the same positions.
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse
+import json
+import platform
+import statistics
+import time
+import timeit
+import tracemalloc
+import ai
+import game_board
+import savegame
+import seeding
+import statreader
+import status_effects
+import tile
+import unit
+import bonuses
+
+OBJECT_COUNT = 20000
+
+
+def unslotted(cls):
+    """Copy of a slotted class that stores its attributes in a __dict__ instead"""
+    skipped = set(cls.__slots__) | {'__slots__', '__dict__', '__weakref__'}
+    namespace = {name: value for name, value in vars(cls).items() if name not in skipped}
+    return type(cls.__name__ + 'WithDict', cls.__bases__, namespace)
+
+
+def bytes_per_object(factory, count=OBJECT_COUNT):
+    """Average memory allocated per object made by factory"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [factory(i) for i in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del objects
+    return allocated / count
+
+
+def model_factories(tile_class, unit_class, effect_class, bonus_class):
+    template = statreader.template_of('statsheets/Knight.txt')
+    poison = status_effects.definition_of('poison')
+    return {
+        'Tile': lambda i: tile_class(i % 100, i // 100),
+        'Unit': lambda i: unit_class(template=template, player=None),
+        'Status_Effect': lambda i: effect_class(poison),
+        'Bonus': lambda i: bonus_class(['infantry'], 1.5, []),
+    }
+
+
+def bench_memory():
+    """Bytes per instance of the core model classes, slotted and dict-backed"""
+    slotted = model_factories(tile.Tile, unit.Unit, status_effects.Status_Effect, bonuses.Bonus)
+    dict_backed = model_factories(unslotted(tile.Tile), unslotted(unit.Unit),
+                                  unslotted(status_effects.Status_Effect), unslotted(bonuses.Bonus))
+    results = {}
+    for name in slotted:
+        results[name] = {
+            'slotted_bytes': bytes_per_object(slotted[name]),
+            'dict_bytes': bytes_per_object(dict_backed[name]),
+        }
+    return results
+
+
+def bench_attribute_access(number=200000):
+    """Nanoseconds per read of common Tile and Unit attributes, slotted and dict-backed"""
+    template = statreader.template_of('statsheets/Knight.txt')
+    results = {}
+    for label, tile_class, unit_class in (('slotted', tile.Tile, unit.Unit),
+                                          ('dict', unslotted(tile.Tile), unslotted(unit.Unit))):
+        square = tile_class(3, 4)
+        square.addUnit(unit_class(template=template, player=None))
+        seconds = timeit.timeit(lambda: (square.x, square.y, square.unit.hp, square.unit.attacks, square.unit.getArmor()),
+                                number=number)
+        results[label + '_ns'] = seconds / number * 1e9
+    return results
+
+
+# Board sizes (width, height) and unit densities (fraction of cells occupied) run by default
+BOARD_SIZES = ((10, 20), (40, 40), (100, 100))
+DENSITIES = (0.05, 0.2)
+REPEAT = 5
+# Unit types scattered over benchmark boards
+UNIT_MIX = ('Knight.txt', 'Archer.txt', 'Catapult.txt', 'Swordsmen.txt', 'Pikeman.txt',
+            'Poison Archer.txt', 'Light Cavalry.txt', 'Builder.txt', 'Farm.txt', 'Castle.txt')
+# Tile size of the headless renderer; small so large boards fit a sane window
+RENDER_TILE_SIZE = 8
+
+
+def populated_board(width, height, density, seed=seeding.DEFAULT_SEED):
+    """Board with about density * cells units of both players, a quarter of them poisoned
+
+    Player 0's catapult stands two cells above a cross of enemy knights in the
+    middle of the board, so there is always an area attack to make.
+    """
+    board = game_board.GameBoard(width, height, seed=seed)
+    rng = board.random_stream('benchmark', 'layout')
+    cx, cy = width // 2, height // 2
+    arena = {(cx, cy - 2), (cx, cy), (cx - 1, cy), (cx + 1, cy), (cx, cy - 1), (cx, cy + 1)}
+    board.initialize_unit(cx, cy - 2, 'statsheets/Catapult.txt', 0, prebuilt=True)
+    for x, y in arena - {(cx, cy - 2)}:
+        board.initialize_unit(x, y, 'statsheets/Knight.txt', 1, prebuilt=True)
+    cells = [(x, y) for y in range(height) for x in range(width) if (x, y) not in arena]
+    poison = status_effects.definition_of('poison')
+    for x, y in rng.sample(cells, min(len(cells), int(width * height * density))):
+        board.initialize_unit(x, y, 'statsheets/' + rng.choice(UNIT_MIX), rng.randrange(2), prebuilt=True)
+        if rng.random() < 0.25:
+            board.tile_at(x, y).get_unit().add_status_effect(poison)
+    return board
+
+
+def timings(seconds, calls=1):
+    """Median and best time of one call, in microseconds, from per-repeat totals"""
+    return {'median_us': statistics.median(seconds) / calls * 1e6,
+            'min_us': min(seconds) / calls * 1e6,
+            'calls': calls}
+
+
+def time_fresh(snapshot, operation, repeat):
+    """Time operation(board) on a new copy of a saved board each repeat"""
+    seconds = []
+    for i in range(repeat):
+        board = savegame.unpack(snapshot)
+        start = time.perf_counter()
+        operation(board)
+        seconds.append(time.perf_counter() - start)
+    return timings(seconds)
+
+
+def time_per_call(operation, arguments, repeat):
+    """Time operation(argument) over every argument, per call"""
+    seconds = timeit.repeat(lambda: [operation(argument) for argument in arguments], number=1, repeat=repeat)
+    return timings(seconds, max(1, len(arguments)))
+
+
+def bench_engine(width, height, density, seed=seeding.DEFAULT_SEED, repeat=REPEAT):
+    """Microseconds per call of the engine's hot paths on one populated board"""
+    board = populated_board(width, height, density, seed)
+    snapshot = savegame.pack(board)
+    acting = [square for square in board.occupied_tiles() if square.get_unit().getPlayer() == board.get_player_acting()]
+    cx, cy = width // 2, height // 2
+    results = {
+        'get_reachable_squares': time_per_call(
+            lambda square: board.get_reachable_squares(square, square.get_unit().getSpeed()), acting, repeat),
+        'moveable_tiles_from': time_per_call(board.moveable_tiles_from, acting, repeat),
+        'attackable_tiles_from': time_per_call(board.attackable_tiles_from, acting, repeat),
+        'attack_area': time_fresh(
+            snapshot, lambda fresh: fresh.attack(fresh.tile_at(cx, cy - 2), fresh.tile_at(cx, cy)), repeat),
+        'next_turn': time_fresh(snapshot, lambda fresh: fresh.next_turn(), repeat),
+        'do_income': time_per_call(board.do_income, [board.get_player_num(0), board.get_player_num(1)], repeat),
+        'ai_take_turn': time_fresh(
+            snapshot,
+            lambda fresh: ai.HeuristicAI(fresh.get_player_acting(), seeding.stream(seed, 'ai', fresh.get_player_acting().getTeam())).take_turn(fresh),
+            repeat),
+    }
+    results.update(bench_render(board, repeat))
+    return {'width': width, 'height': height, 'density': density, 'units': len(board.occupied_tiles()),
+            'results': results}
+
+
+def bench_render(board, repeat):
+    """BoardRenderer.update_all with everything redrawn, and with nothing changed"""
+    import board_renderer
+    renderer = board_renderer.BoardRenderer(board, RENDER_TILE_SIZE)
+    renderer.update_all()
+
+    def full_redraw():
+        renderer.full_redraw = True
+        renderer.update_all()
+    return {
+        'render_full': timings(timeit.repeat(full_redraw, number=1, repeat=repeat)),
+        'render_idle': timings(timeit.repeat(renderer.update_all, number=1, repeat=repeat)),
+    }
+
+
+def run(sizes=BOARD_SIZES, densities=DENSITIES, seed=seeding.DEFAULT_SEED, repeat=REPEAT):
+    """Every benchmark, as a JSON-serialisable dict"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'repeat': repeat,
+        'memory': bench_memory(),
+        'attribute_access': bench_attribute_access(),
+        'engine': [bench_engine(width, height, density, seed, repeat) for width, height in sizes for density in densities],
+    }
+
+
+def board_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', type=board_size, nargs='+', default=BOARD_SIZES, metavar='WxH')
+    parser.add_argument('--densities', type=float, nargs='+', default=DENSITIES)
+    parser.add_argument('--seed', type=int, default=seeding.DEFAULT_SEED)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--json', metavar='PATH', help='also write the results to this file')
+    args = parser.parse_args()
+    results = run(args.sizes, args.densities, args.seed, args.repeat)
+
+    print('Bytes per object')
+    for name, result in results['memory'].items():
+        saving = 1 - result['slotted_bytes'] / result['dict_bytes']
+        print(f"  {name:14} slotted {result['slotted_bytes']:7.1f}  dict {result['dict_bytes']:7.1f}  saving {saving:.0%}")
+    access = results['attribute_access']
+    print('Attribute reads (tile.x, tile.y, unit.hp, unit.attacks, unit.getArmor())')
+    print(f"  slotted {access['slotted_ns']:.1f} ns  dict {access['dict_ns']:.1f} ns")
+    for engine in results['engine']:
+        print(f"Engine {engine['width']}x{engine['height']}, density {engine['density']}, {engine['units']} units (median us per call)")
+        for name, result in engine['results'].items():
+            print(f"  {name:22} {result['median_us']:10.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
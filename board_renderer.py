@@ -5,7 +5,18 @@ from colors import COLORS
 import UI
 import game_board
 import tile
-import mines
+import statreader
+import profiler
+import healthbars
+import board_storage
+import game_log
+
+log = game_log.logger('render')
+
+# tile_states entry of a tile that shows nothing but the static layer
+PLAIN_TILE = (None,)
+# tile_states entry of a tile covered by the profiler overlay, so it is repainted next frame
+OVERLAID_TILE = ('overlaid',)
 
 class BoardRenderer:
     """Handles all visual rendering of the game board"""
@@ -25,6 +36,27 @@ class BoardRenderer:
         
         # Track last selected tile for production menu persistence
         self.last_selected_tile = None
+        # Inputs the current production menu was built from
+        self.production_key = None
+
+        # Dirty-rectangle state: what each tile looked like when last drawn, the board
+        # state the highlights were computed for, and the rectangles touched this frame
+        self.tile_states = {}
+        self.last_board_state = None
+        # Background, grid and mine outlines prerendered off-screen, rebuilt on resize
+        self.static_layer = None
+        self.mine_tiles = set()
+        # Outline colors drawn over the static layer (selection, move, attack, build)
+        self.outlines = {}
+        # Move/attack/build/produce highlights and the selection state they were computed for
+        self.highlight_key = None
+        self.highlight_outlines = {}
+        # Health bars of all units, drawn once per hp change and copied onto repainted tiles
+        self.healthbar_layer = healthbars.HealthbarLayer()
+        self.full_redraw = True
+        self.dirty_rects = []
+        # Frame-time profiler, shown as an overlay on the board when enabled
+        self.profiler = profiler.FrameProfiler()
         
         # Initialize UI
         self.UI = UI.UI(
@@ -42,10 +74,12 @@ class BoardRenderer:
                 is_highlighted=False
             )
         )
+        self.UI.profiler = self.profiler
         self.resize_window()
     
     def handle_click(self, pos: tuple) -> bool:
         """Handle mouse clicks - returns True if handled by UI"""
+        self.invalidate()
         if pos[0] > self.game_board.get_width() * self.tile_dimensions:
             self.UI.doClick(pos)
             return True
@@ -55,6 +89,20 @@ class BoardRenderer:
                 self.game_board.process_tile_click(tile_clicked)
             return False
     
+    def handle_keypress(self, key: str) -> None:
+        """Forward a hotkey to the UI"""
+        self.invalidate()
+        self.UI.handle_keypress(key)
+
+    def toggle_profiler(self) -> None:
+        """Show or hide the frame-time overlay"""
+        self.profiler.toggle()
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Recheck the whole board and redraw the UI on the next frame"""
+        self.last_board_state = None
+
     def tile_from_coords(self, position) -> None:
         """Convert screen coordinates to tile"""
         return self.game_board.tile_from_coords(position, self.tile_dimensions)
@@ -65,51 +113,141 @@ class BoardRenderer:
         self.tile_dimensions = min(int(self.window_width/(self.game_board.get_width() + 5)), int(self.window_height/self.game_board.get_height()))
         self.board_width = self.tile_dimensions * self.game_board.get_width()
         self.ui_width = 5 * self.tile_dimensions
-        self.resize_units()
         self.UI.update_dimensions(self.window_width, self.window_height)
         self.UI.change_window_width(self.window_width)
         self.UI.set_start(self.board_width + 20, 65)
         self.UI.change_next_turn_button()
-        print(f"Window resized to: {self.window_width}x{self.window_height}")
-
-    def resize_units(self) -> None:
-        for unit in self.game_board.get_units():
-            unit.set_image(pygame.transform.scale(unit.get_original_image(), (self.tile_dimensions, self.tile_dimensions)))
-            tile = self.game_board.tile_of_unit(unit)
-            screen_x = self.tile_dimensions * tile.get_x()
-            screen_y = self.tile_dimensions * tile.get_y()
-            self.window.blit(unit.get_image(), (screen_x, screen_y))
-    
-    def update_all(self) -> None:
-        """Update all visual elements"""
-        self.reset_tiles()
-        self.UI.drawButtons()
-        self.highlight_moveable_tiles()
-        self.highlight_attackable_tiles()
-        self.highlight_produceable_tiles()
-        self.highlight_buildeable_tiles()
-        self.highlight_mines()
-        self.color_tiles()
-        self.UI.showPlayerInfo(self.game_board.get_player_acting())
-        self.UI.displayHotkeys()
-        self.UI.display_turn_count(self.game_board.get_turn())
-        self.draw_healthbars()
-        self.generate_production_actions()
-        # Display page info for production menu
-        page_info = self.UI.get_page_info()
-        if page_info:
-            self.UI.drawText(self.UI.UIstartX, self.UI.y_scaler * (self.UI.UIstartY + 180), page_info)
+        # Production buttons are laid out for the UI scale, which the resize changed
+        self.production_key = None
+        self.full_redraw = True
+        log.debug("Window resized to: %dx%d", self.window_width, self.window_height)
+
+    def update_all(self) -> list:
+        """Redraw whatever changed since the last frame and return the dirty rectangles"""
+        self.dirty_rects = []
+        self.profiler.begin_frame()
+        with self.profiler.stage('reset_tiles'):
+            if self.full_redraw:
+                self.build_static_layer()
+                self.healthbar_layer.resize(self.static_layer.get_width(), self.static_layer.get_height(), self.tile_dimensions)
+                self.window.fill(COLORS.DGREEN)
+                self.window.blit(self.static_layer, (0, 0))
+                self.profiler.count('blits')
+                self.tile_states = {}
+                self.last_board_state = None
+                self.dirty_rects.append(self.window.get_rect())
+
+        board_state = self.board_state()
+        if board_state != self.last_board_state:
+            self.last_board_state = board_state
+            with self.profiler.stage('highlights'):
+                self.outlines = dict(self.highlights())
+            with self.profiler.stage('color_tiles'):
+                redrawn = self.color_tiles()
+            with self.profiler.stage('healthbars'):
+                self.draw_healthbars(redrawn)
+            with self.profiler.stage('production actions'):
+                self.generate_production_actions()
+            self.draw_ui()
+            if self.profiler.enabled:
+                self.draw_profiler_overlay()
+
+        self.full_redraw = False
+        self.profiler.end_frame()
+        return self.dirty_rects
+
+    def is_dirty(self) -> bool:
+        """Whether the next update_all would draw anything"""
+        return self.full_redraw or self.board_state() != self.last_board_state
+
+    def board_state(self) -> tuple:
+        """Everything the board and UI drawing depends on besides the tiles themselves"""
+        return (
+            self.game_board.version,
+            self.game_board.get_selected_tile(),
+            self.game_board.get_second_selected_tile(),
+            self.game_board.get_targeted_tile(),
+            self.game_board.get_building_tile(),
+            self.game_board.get_click_state(),
+            self.game_board.get_player_acting(),
+        )
+
+    def draw_ui(self) -> None:
+        """Redraw the UI panel"""
+        panel = pygame.Rect(self.board_width, 0, self.window_width - self.board_width, self.window_height)
+        with self.profiler.stage('player info'):
+            self.window.fill(COLORS.DGREEN, panel)
+            self.UI.drawButtons()
+            selected = self.game_board.get_selected_tile()
+            if selected and selected.get_unit():
+                self.UI.displayStats(selected)
+            self.UI.showPlayerInfo(self.game_board.get_player_acting())
+        with self.profiler.stage('hotkeys'):
+            self.UI.displayHotkeys()
+        with self.profiler.stage('player info'):
+            self.UI.display_turn_count(self.game_board.get_turn())
+            # Display page info for production menu
+            page_info = self.UI.get_page_info()
+            if page_info:
+                self.UI.drawText(self.UI.UIstartX, self.UI.y_scaler * (self.UI.UIstartY + 180), page_info)
+        self.dirty_rects.append(panel)
 
+    def draw_profiler_overlay(self) -> None:
+        """Draw frame-time percentiles, stage timings and draw counts over the top of the board"""
+        lines = [self.UI.render_text(line) for line in self.profiler.summary_lines()]
+        rect = pygame.Rect(
+            0, 0,
+            min(self.board_width, max(line.get_width() for line in lines) + 8),
+            min(self.window_height, sum(line.get_height() for line in lines) + 8)
+        )
+        self.window.fill(COLORS.TAN, rect)
+        y = 4
+        for line in lines:
+            self.window.blit(line, (4, y))
+            y += line.get_height()
+        self.dirty_rects.append(rect)
+        # Repaint the tiles underneath on the next frame
+        for x in range(rect.right // self.tile_dimensions + 1):
+            for y in range(rect.bottom // self.tile_dimensions + 1):
+                covered = self.game_board.tile_at(x, y)
+                if covered:
+                    self.tile_states[covered] = OVERLAID_TILE
     
+    def build_static_layer(self) -> None:
+        """Render the parts of the board that never change between frames into one surface"""
+        self.static_layer = pygame.Surface((self.board_width, self.tile_dimensions * self.game_board.get_height()))
+        self.static_layer.fill(COLORS.DGREEN)
+        for y in range(self.game_board.get_height()):
+            for x in range(self.game_board.get_width()):
+                pygame.draw.rect(self.static_layer, COLORS.BLACK, self.cell_rect(x, y), 1)
+        self.highlight_mines()
+
+    def highlights(self) -> dict:
+        """Highlight outlines for the selection, recomputed only when the selection or board changes"""
+        selected = self.game_board.get_selected_tile()
+        key = (
+            selected,
+            selected.get_active_unit() if selected else None,
+            self.game_board.get_click_state(),
+            self.game_board.version,
+        )
+        if key != self.highlight_key:
+            self.highlight_key = key
+            self.reset_tiles()
+            self.highlight_moveable_tiles()
+            self.highlight_attackable_tiles()
+            self.highlight_produceable_tiles()
+            self.highlight_buildeable_tiles()
+            self.show_mines()
+            self.highlight_outlines = self.outlines
+        return self.highlight_outlines
+
     def reset_tiles(self) -> None:
-        """Clear the screen and reset tile colors"""
-        self.window.fill(COLORS.DGREEN)
-        for row in self.game_board.tiles:
-            for square in row:
-                self.change_color(COLORS.BLACK, square)
-    
-    def color_tiles(self) -> None:
-        """Apply colors to special tiles and render everything"""
+        """Clear the highlight overlay"""
+        self.outlines = {}
+    
+    def color_tiles(self) -> list:
+        """Apply colors to special tiles, redraw the tiles that changed and return them"""
         selected = self.game_board.get_selected_tile()
         second_selected = self.game_board.get_second_selected_tile()
         targeted = self.game_board.get_targeted_tile()
@@ -117,8 +255,6 @@ class BoardRenderer:
 
         if selected:
             self.change_color(COLORS.RED, selected)
-            if selected.get_unit():
-                self.UI.displayStats(selected)
 
         if building:
             self.change_color(COLORS.GREEN, building)
@@ -130,11 +266,60 @@ class BoardRenderer:
         if targeted:
             self.change_color(COLORS.YELLOW, targeted)
         
-        # Render all tiles
-        for row in self.game_board.tiles:
-            for square in row:
-                self.update_image(square)
-                self.draw_tile(square.getOutline(), square)
+        # Render only the tiles that look different from the last time they were drawn.
+        # Tiles missing from tile_states show the plain static layer, so only occupied,
+        # highlighted or previously drawn tiles can need a redraw.
+        candidates = set(self.game_board.occupied_tiles())
+        candidates.update(self.outlines)
+        candidates.update(self.tile_states)
+        redrawn = []
+        for square in sorted(candidates, key=board_storage.row_order):
+            state = self.tile_state(square)
+            if self.tile_states.get(square, PLAIN_TILE) != state:
+                if state == PLAIN_TILE:
+                    del self.tile_states[square]
+                else:
+                    self.tile_states[square] = state
+                self.redraw_tile(square)
+                redrawn.append(square)
+        return redrawn
+
+    def tile_state(self, tile: tile.Tile) -> tuple:
+        """What a tile's pixels depend on besides the static layer"""
+        unit = tile.get_unit()
+        if unit:
+            return (self.outlines.get(tile), self.sprite_of(unit), unit.getHp(), unit.getMaxHp())
+        return (self.outlines.get(tile),)
+
+    def redraw_tile(self, tile: tile.Tile) -> None:
+        """Repaint one tile: static background, unit and outline"""
+        rect = self.tile_rect(tile)
+        self.window.blit(self.static_layer, rect, rect)
+        self.profiler.count('blits')
+        if tile.get_unit():
+            # The sprite covers the static outline, so it is drawn again on top
+            self.update_image(tile)
+            self.draw_tile(self.outline_of(tile), tile)
+        elif tile in self.outlines:
+            self.draw_tile(self.outlines[tile], tile)
+        self.dirty_rects.append(rect)
+
+    def tile_rect(self, tile: tile.Tile) -> pygame.Rect:
+        return self.cell_rect(tile.get_x(), tile.get_y())
+
+    def cell_rect(self, x: int, y: int) -> pygame.Rect:
+        return pygame.Rect(
+            x * self.tile_dimensions,
+            y * self.tile_dimensions,
+            self.tile_dimensions,
+            self.tile_dimensions
+        )
+
+    def outline_of(self, tile: tile.Tile) -> tuple:
+        """Outline color of a tile: its highlight, or the static mine/grid color"""
+        if tile in self.outlines:
+            return self.outlines[tile]
+        return COLORS.TAN if tile in self.mine_tiles else COLORS.BLACK
     
     def highlight_moveable_tiles(self) -> None:
         """Highlight tiles the selected unit can move to"""
@@ -148,7 +333,7 @@ class BoardRenderer:
         selected = self.game_board.get_selected_tile()
         if selected:
             if selected.get_unit():
-                if 'builder' in selected.get_unit().getTags() and selected.get_unit().getAttacks() >= 1:
+                if selected.get_unit().hasTag('builder') and selected.get_unit().getAttacks() >= 1:
                     for tile in self.game_board.buildable_tiles_from(selected):
                         self.highlight_tile(tile, COLORS.BLUE)
     
@@ -165,11 +350,17 @@ class BoardRenderer:
                 self.highlight_tile(tile, COLORS.BLUE)
     
     def highlight_mines(self):
-        for items in mines.mineCoords:    
-            x = items[0]
-            y = items[1]
+        """Outline the mines on the static layer"""
+        self.mine_tiles = set()
+        for x, y in self.game_board.mine_coords:
             tile = self.game_board.tile_at(x, y)           
-            self.change_color(COLORS.TAN, tile)
+            self.mine_tiles.add(tile)
+            pygame.draw.rect(self.static_layer, COLORS.TAN, self.tile_rect(tile), 1)
+
+    def show_mines(self) -> None:
+        """Let the mine outlines show through move and attack highlights"""
+        for tile in self.mine_tiles:
+            self.outlines.pop(tile, None)
             
     def generate_production_actions(self) -> None:
         """Generate UI buttons based on game state"""
@@ -179,16 +370,12 @@ class BoardRenderer:
         if selected != self.last_selected_tile:
             self.UI.clearButtons()
             self.last_selected_tile = selected
+            self.production_key = None
         
         if (selected and selected.get_unit() and 
-            'factory' in selected.get_unit().getTags() and 
+            selected.get_unit().hasTag('factory') and 
             selected.get_unit().getPlayer() == self.game_board.get_player_acting()):
-            
-            production_functions = self.game_board.unit_production_functions_from(
-                selected.get_x(), selected.get_y(), self.tile_dimensions
-            )
-            self.UI.generateButtons(*production_functions)
-            self.UI.generateHotkeys(*self.game_board.hotkey_functions_from(selected.get_x(), selected.get_y(), self.tile_dimensions))
+            self.generate_menu(selected)
         self.generate_build_actions()
     
     def generate_build_actions(self) -> None:
@@ -196,38 +383,48 @@ class BoardRenderer:
         if (selected and selected.get_unit() and 
             selected.get_unit().getName().lower() == 'builder' and 
             selected.get_unit().getPlayer() == self.game_board.get_player_acting()):
-            
-            production_functions = self.game_board.unit_production_functions_from(
-                selected.get_x(), selected.get_y(), self.tile_dimensions
-            )
-            self.UI.generateButtons(*production_functions)
-            self.UI.generateHotkeys(*self.game_board.hotkey_functions_from(selected.get_x(), selected.get_y(), self.tile_dimensions))
+            self.generate_menu(selected)
+
+    def generate_menu(self, selected: tile.Tile) -> None:
+        """Rebuild the production buttons and hotkeys only when something they show has changed"""
+        unit = selected.get_unit()
+        key = (
+            unit,
+            tuple(self.game_board.empty_surrounding_tiles(selected.get_x(), selected.get_y())),
+            self.game_board.get_player_acting().getMoney(),
+            unit.getAttacks(),
+            self.tile_dimensions,
+        )
+        if key == self.production_key:
+            return
+        self.production_key = key
+        production_functions = self.game_board.unit_production_functions_from(
+            selected.get_x(), selected.get_y(), self.tile_dimensions
+        )
+        self.UI.generateButtons(*production_functions)
+        self.UI.generateHotkeys(*self.game_board.hotkey_functions_from(selected.get_x(), selected.get_y(), self.tile_dimensions))
     
     # ==========================================================================
     # DRAWING METHODS
     # ==========================================================================
     
     def change_color(self, color: str, tile: tile.Tile) -> None:
-        """Change a tile's outline color"""
-        tile.changeOutline(color)
+        """Change a tile's outline color on the highlight overlay"""
+        self.outlines[tile] = color
 
-    def draw_healthbar(self, unit):
-        unit.get_healthbar().draw_healthbar(self.window, self.tile_dimensions, unit)
-
-    def draw_healthbars(self):
-        for unit in self.game_board.get_units():
-            self.draw_healthbar(unit)
+    def draw_healthbars(self, tiles):
+        """Bring the health bar layer up to date for repainted tiles and copy it onto them"""
+        for square in tiles:
+            if self.healthbar_layer.update(square.get_x(), square.get_y(), square.get_unit()):
+                self.profiler.count('draws', 2)
+            if self.healthbar_layer.has_bar(square.get_x(), square.get_y()):
+                self.healthbar_layer.draw(self.window, self.tile_rect(square))
+                self.profiler.count('blits')
     
     def draw_tile(self, color: str, tile: tile.Tile) -> None:
-        """Draw a tile with the specified color"""
-        self.change_color(color, tile)
-        rect = (
-            tile.get_x() * self.tile_dimensions,
-            tile.get_y() * self.tile_dimensions,
-            self.tile_dimensions,
-            self.tile_dimensions
-        )
-        pygame.draw.rect(self.window, tile.getOutline(), rect, 1)
+        """Draw a tile outline with the specified color"""
+        pygame.draw.rect(self.window, color, self.tile_rect(tile), 1)
+        self.profiler.count('draws')
     
     def highlight_tile(self, tile: tile.Tile, color: str) -> None:
         """Highlight a tile with a color"""
@@ -236,7 +433,14 @@ class BoardRenderer:
     def update_image(self, tile: tile.Tile) -> None:
         """Draw unit image on tile if present"""
         if tile.get_unit():
-            self.move_image(tile.getForeground(), tile.get_x(), tile.get_y())
+            self.move_image(self.sprite_of(tile.get_unit()), tile.get_x(), tile.get_y())
+
+    def sprite_of(self, unit) -> pygame.Surface:
+        """Get a unit's sprite at the current tile size, scaling it the first time that size is drawn"""
+        image_name = unit.get_template().image_name
+        if image_name is None:
+            return unit.get_image()
+        return statreader.team_sprite(image_name, unit.getPlayer(), self.tile_dimensions)
     
     def move_image(self, image: pygame.image.load, x: int, y: int) -> None:
         """Blit an image to the screen at tile coordinates"""
@@ -244,6 +448,7 @@ class BoardRenderer:
             screen_x = self.tile_dimensions * x
             screen_y = self.tile_dimensions * y
             self.window.blit(image, (screen_x, screen_y))
+            self.profiler.count('blits')
     
     def get_window(self) -> pygame.display:
         """Get the pygame window surface"""
@@ -0,0 +1,92 @@
+# board_storage.py - Sparse tile storage for boards of any size
+import weakref
+import tile
+
+# Width and height in cells of one chunk of the board
+CHUNK_SIZE = 16
+
+
+def row_order(square):
+    """Sort key putting tiles in the order a row-by-row scan of the board visits them"""
+    return (square.y, square.x)
+
+
+class ChunkedTiles(object):
+    """Board cells kept in fixed-size chunks that exist only while something occupies them
+
+    Occupied tiles are held by their chunk. Empty tiles are made on demand by tile_at
+    and shared for as long as anything still refers to them, so the same cell keeps
+    giving back the same Tile while it is selected, highlighted or drawn.
+    """
+
+    def __init__(self, width, height, ledger=None):
+        self.width = width
+        self.height = height
+        # IncomeLedger given to every tile
+        self.ledger = ledger
+        # (chunk x, chunk y) -> {(x, y): tile} of the occupied tiles in that chunk
+        self.chunks = {}
+        # (x, y) -> tile, for every tile still referenced from anywhere
+        self.live_tiles = weakref.WeakValueDictionary()
+        # Occupied tiles in row order, rebuilt after the occupants change
+        self.ordered = None
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def tile_at(self, x, y):
+        """The tile at a cell, made if nothing holds it yet; None outside the board"""
+        if not self.in_bounds(x, y):
+            return None
+        square = self.live_tiles.get((x, y))
+        if square is None:
+            square = tile.Tile(x, y)
+            square.storage = self
+            square.ledger = self.ledger
+            self.live_tiles[(x, y)] = square
+        return square
+
+    def occupant(self, x, y):
+        """The unit on a cell, without making a tile for empty cells"""
+        chunk = self.chunks.get((x // CHUNK_SIZE, y // CHUNK_SIZE))
+        if chunk:
+            square = chunk.get((x, y))
+            if square is not None:
+                return square.unit
+        return None
+
+    def occupant_changed(self, square):
+        """Keep a tile in its chunk while it has a unit, freeing chunks that empty out"""
+        key = (square.x // CHUNK_SIZE, square.y // CHUNK_SIZE)
+        chunk = self.chunks.get(key)
+        if square.unit is not None:
+            if chunk is None:
+                chunk = self.chunks[key] = {}
+            chunk[(square.x, square.y)] = square
+        elif chunk is not None:
+            chunk.pop((square.x, square.y), None)
+            if not chunk:
+                del self.chunks[key]
+        self.ordered = None
+
+    def occupied(self):
+        """Occupied tiles in row order; a snapshot, safe to iterate while units move"""
+        if self.ordered is None:
+            self.ordered = sorted((square for chunk in self.chunks.values() for square in chunk.values()),
+                                  key=row_order)
+        return self.ordered
+
+    def occupied_in_area(self, x, y, distance):
+        """Occupied tiles within a Manhattan distance of a cell, in row order"""
+        found = []
+        first_cx, last_cx = max(0, x - distance) // CHUNK_SIZE, min(self.width - 1, x + distance) // CHUNK_SIZE
+        first_cy, last_cy = max(0, y - distance) // CHUNK_SIZE, min(self.height - 1, y + distance) // CHUNK_SIZE
+        for cy in range(first_cy, last_cy + 1):
+            for cx in range(first_cx, last_cx + 1):
+                chunk = self.chunks.get((cx, cy))
+                if chunk:
+                    for (tx, ty), square in chunk.items():
+                        if abs(tx - x) + abs(ty - y) <= distance:
+                            found.append(square)
+        found.sort(key=row_order)
+        return found
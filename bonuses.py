@@ -1,16 +1,23 @@
+from tag_bits import mask_of
+
 class Bonus(object):
+    __slots__ = ('tags', 'exceptions', 'multiplier', 'mask')
+
     def __init__(self, tags, multiplier, exceptions=['nothing']):
         self.tags = tags
         self.exceptions = exceptions
         self.multiplier = multiplier
+        # Tags the bonus applies to, minus the exceptions
+        self.mask = mask_of(tags) & ~mask_of(exceptions)
 
     def bonusAgainst(self, target):
-        for tag in target.getTags():
-            if tag in self.tags and tag not in self.exceptions:
-                return self.multiplier
+        if target.tag_mask & self.mask:
+            return self.multiplier
         return 1
 
 class Bonuses(object):
+    __slots__ = ('bonuses',)
+
     def __init__(self, *bonuses):
         self.bonuses = bonuses
         # This is a dictionary.
@@ -18,6 +25,5 @@ class Bonuses(object):
     def bonusAgainst(self, target):
         highestBonus = 1
         for bonus in self.bonuses:
-            if bonus.bonusAgainst(target) > highestBonus:
-                highestBonus = bonus.bonusAgainst(target)
+            highestBonus = max(highestBonus, bonus.bonusAgainst(target))
         return highestBonus
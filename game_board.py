@@ -1,5 +1,4 @@
 # game_board.py - Pure game logic, no pygame dependencies
-import tile
 import math
 import statreader
 import player
@@ -7,15 +6,26 @@ from collections import deque
 import copy
 import unit
 import mines
+import maps
+import income
+import board_storage
+import seeding
+import game_log
+
+log = game_log.logger('turn')
 
 class GameBoard:
     """Handles pure game logic - no rendering or pygame dependencies"""
     
-    def __init__(self, width=10, height=20):
-        self.width = width
-        self.height = height
+    def __init__(self, width=10, height=20, game_map=None, seed=seeding.DEFAULT_SEED):
+        # Without a map file the board is open ground with the default mines
+        if game_map is None:
+            game_map = maps.GameMap.blank(width, height, mines.mineCoords)
+        self.game_map = game_map
+        self.width = game_map.width
+        self.height = game_map.height
+        self.mine_coords = game_map.objective_coords()
         self.turn_count = 1
-        self.tiles = []
         self.selected_tile = None
         self.second_selected_tile = None
         self.targeted_tile = None
@@ -27,12 +37,16 @@ class GameBoard:
         self.building_tile = None
         # Mapping of player -> AI controller (if any)
         self.ai_controllers = {}
-        
-        # Initialize empty board
-        for y in range(self.height):
-            self.tiles.append([])
-            for x in range(self.width):
-                self.tiles[-1].append(tile.Tile(x, y))
+        # Bumped whenever units, selection or turn state change so views can tell what is stale
+        self.version = 0
+        # Income of each player, updated by the tiles as units come and go
+        self.income = income.IncomeLedger(self.game_map)
+        # Master seed of every random stream in this game
+        self.seed = seed
+        # ReplayRecorder every command is written to, if the game is being recorded
+        self.recorder = None
+        # Tiles are made on demand; only occupied ones are stored
+        self.storage = board_storage.ChunkedTiles(self.width, self.height, self.income)
     
     # ==========================================================================
     # CORE GAME LOGIC METHODS
@@ -40,9 +54,7 @@ class GameBoard:
     
     def tile_at(self, x, y):
         """Get tile at coordinates"""
-        if 0 <= x < self.width and 0 <= y < self.height:
-            return self.tiles[y][x]
-        return None
+        return self.storage.tile_at(x, y)
     
     def tile_from_coords(self, position, tile_dimensions):
         """Convert pixel coordinates to tile coordinates"""
@@ -58,6 +70,21 @@ class GameBoard:
                 tile.addUnit(statreader.unitFromStatsheet(file_name, self.player1, tile_dimensions, prebuilt=prebuilt))
             else:
                 tile.addUnit(statreader.unitFromStatsheet(file_name, self.player0, tile_dimensions, prebuilt=prebuilt))
+            self.bump_version()
+
+    def random_stream(self, *labels):
+        """Seeded random stream for one consumer of this game, e.g. ('ai', team)"""
+        return seeding.stream(self.seed, *labels)
+
+    def place_starting_units(self, tile_dimensions=40):
+        """Put the map's starting units on the board"""
+        for start in self.game_map.starting_units():
+            self.initialize_unit(start.x, start.y, 'statsheets/' + start.statsheet, start.player,
+                                 tile_dimensions, prebuilt=start.prebuilt)
+
+    def bump_version(self):
+        """Mark the board as changed"""
+        self.version += 1
     
     def set_click_state(self):
         if not(self.selected_tile) or self.selected_tile.get_unit() == None:
@@ -100,8 +127,7 @@ class GameBoard:
         elif self.click_state == 'confirming build':
             if tile_clicked == self.building_tile:
                 actions.append(('build', self.selected_tile, self.building_tile))
-                self.building_tile.get_unit().construct_tick()
-                self.selected_tile.get_unit().do_action()
+                self.build(self.selected_tile, self.building_tile)
                 self.clear_tile_selection()
             else:
                 self.choose_action(tile_clicked)
@@ -122,6 +148,8 @@ class GameBoard:
     def move(self, start, destination):
         """Move a unit from start to destination"""
         if start.get_unit():
+            if self.recorder:
+                self.recorder.move(start, destination)
             start.get_active_unit().doMove()
             # handles all movement carrying logic
             if destination.unit:
@@ -133,8 +161,30 @@ class GameBoard:
                 start.activeUnit = start.unit
             else:
                 start.removeUnit()
+            self.bump_version()
                 
     
+    def build(self, builder_tile, target_tile):
+        """Spend the builder's action advancing construction of the unit on target_tile"""
+        if self.recorder:
+            self.recorder.build(builder_tile, target_tile)
+        target_tile.get_unit().construct_tick()
+        builder_tile.get_unit().do_action()
+        self.bump_version()
+
+    def spend_action(self, tile):
+        """Use up one action of the unit on a tile, e.g. a builder that produced a unit"""
+        if self.recorder:
+            self.recorder.action(tile)
+        tile.get_unit().do_action()
+        self.bump_version()
+
+    def record_to(self, recorder):
+        """Stream every following command to a ReplayRecorder, starting from a keyframe of now"""
+        self.recorder = recorder
+        if recorder:
+            recorder.keyframe(self)
+
     def choose_action(self, tile_clicked):
         acted = 0
         if tile_clicked in self.moveable_tiles_from(self.selected_tile):
@@ -145,7 +195,7 @@ class GameBoard:
             self.clear_tile_selection()
             self.targeted_tile = tile_clicked
             acted = 1
-        elif 'builder' in self.selected_tile.get_unit().getTags():
+        elif self.selected_tile.get_unit().hasTag('builder'):
             if tile_clicked in self.buildable_tiles_from(self.selected_tile) and self.selected_tile.get_unit().getAttacks() >= 1:
                 self.clear_tile_selection()
                 self.building_tile = tile_clicked
@@ -159,6 +209,8 @@ class GameBoard:
         """Handle combat between units, including status effects"""
         if not(start.get_unit()):
             return
+        if self.recorder:
+            self.recorder.attack(start, target)
             
         if target.get_unit().getPlayer() != start.get_unit().getPlayer():
             # Calculate and apply damage
@@ -179,35 +231,31 @@ class GameBoard:
                     start.get_unit().apply_status_on_hit(tile.get_unit())
 
         start.get_unit().doAttack()
+        self.bump_version()
     
     def next_turn(self):
         """Advance to next turn"""
+        if self.recorder:
+            self.recorder.next_turn()
         self.second_selected_tile = None
         self.targeted_tile = None
         self.turn_count += 0.5
 
-        # Process status effects and handle unit deaths FIRST
+        # One pass over the board: tick the acting player's status effects
+        # and reset attacks and movement of every unit
         units_to_remove = []
-        for row in self.tiles:
-            for square in row:
-                if square.get_unit():
-                    if square.get_unit().getPlayer() == self.player_acting:
-                        # Process status effects first
-                        unit_died = square.get_unit().process_status_effects()
-                        if unit_died:
-                            units_to_remove.append(square)
-        
-        # Remove units that died from status effects
+        for square in self.storage.occupied():
+            unit = square.unit
+            if unit.status_effects and unit.player == self.player_acting:
+                if unit.process_status_effects():
+                    units_to_remove.append(square)
+                    continue
+            unit.nextTurn()
+
+        # Remove units that died from status effects together
         for square in units_to_remove:
             square.removeUnit()
         
-        # THEN do normal turn processing (attacks, movement reset) for surviving units
-        for row in self.tiles:
-            for square in row:
-                if square.get_unit():
-                    # Reset attacks and movement without processing status effects again
-                    square.get_unit().nextTurn()
-        
         # Switch active player
         if self.player_acting == self.player0:
             self.player_acting = self.player1
@@ -216,13 +264,16 @@ class GameBoard:
         
         # Process income
         self.do_income(self.player_acting)
+        self.bump_version()
+        if self.recorder:
+            self.recorder.turn_started(self)
 
         # If there's an AI controller for the new active player, run it
         if self.player_acting in getattr(self, 'ai_controllers', {}):
             try:
                 self.ai_controllers[self.player_acting].take_turn(self)
             except Exception as e:
-                print(f"AI error: {e}")
+                log.error("AI error: %s", e, exc_info=True)
     
     # ==========================================================================
     # MOVEMENT AND ATTACK LOGIC
@@ -231,7 +282,7 @@ class GameBoard:
     def register_ai(self, player, controller):
         """Register an AI controller for a player"""
         self.ai_controllers[player] = controller
-    
+
     def moveable_tiles_from(self, start_tile):
         """Get all tiles a unit can move to"""
         move_options = []
@@ -241,7 +292,7 @@ class GameBoard:
             possible_moves = self.get_reachable_squares(start_tile, start_tile.get_active_unit().getSpeed())
             if start_tile.get_active_unit().canMove() and start_tile.get_active_unit().getPlayer() == self.player_acting:
                 for move in possible_moves:
-                    square = self.tiles[move[1]][move[0]]
+                    square = self.tile_at(move[0], move[1])
                     if square.tileEmpty() and square != start_tile:
                         if self.distance_between(start_tile, square) <= start_tile.get_active_unit().getSpeed():
                             move_options.append(square)
@@ -294,19 +345,17 @@ class GameBoard:
         
         if start_tile.get_unit():
             if start_tile.get_unit().getAttacks() and start_tile.get_unit().getPlayer() == self.player_acting:
-                for row in self.tiles:
-                    for tile in row:
-                        if start_tile.get_unit() and tile.get_unit():
-                            if (tile.get_unit().getPlayer() != start_tile.get_unit().getPlayer() and 
-                                self.distance_between(start_tile, tile) <= start_tile.get_unit().getRange()):
-                                attackable_squares.append(tile)
+                attack_range = start_tile.get_unit().getRange()
+                for tile in self.storage.occupied_in_area(start_tile.get_x(), start_tile.get_y(), attack_range):
+                    if tile.get_unit().getPlayer() != start_tile.get_unit().getPlayer():
+                        attackable_squares.append(tile)
         
         return attackable_squares
     
     def get_reachable_squares(self, start, max_speed):
         """BFS to find all reachable squares within movement range"""
-        rows = len(self.tiles)
-        cols = len(self.tiles[0])
+        rows = self.height
+        cols = self.width
         
         directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
         queue = deque([(start.get_x(), start.get_y(), 0)])
@@ -327,7 +376,7 @@ class GameBoard:
                 nx, ny = x + dx, y + dy
                 
                 if (0 <= nx < cols and 0 <= ny < rows and 
-                    self.move_throughable(self.tiles[ny][nx])):
+                    self.cell_move_throughable(nx, ny)):
                     if (nx, ny) not in visited:
                         visited.add((nx, ny))
                         queue.append((nx, ny, dist + 1))
@@ -340,14 +389,20 @@ class GameBoard:
     
     def tiles_in_range(self, start_tile, range_val):
         """Generator for all tiles within range"""
-        for row in self.tiles:
-            for square in row:
-                if self.distance_between(start_tile, square) <= range_val:
-                    yield square
+        x, y = start_tile.get_x(), start_tile.get_y()
+        for ny in range(max(0, y - range_val), min(self.height, y + range_val + 1)):
+            for nx in range(max(0, x - range_val), min(self.width, x + range_val + 1)):
+                if abs(nx - x) + abs(ny - y) <= range_val:
+                    yield self.tile_at(nx, ny)
     
     def move_throughable(self, tile):
         """Check if a tile can be moved through"""
         return tile.moveThroughable(self.player_acting)
+
+    def cell_move_throughable(self, x, y):
+        """move_throughable for a cell, without making a tile for it"""
+        unit = self.storage.occupant(x, y)
+        return unit is None or unit.moveThroughable(self.player_acting)
     
     # ==========================================================================
     # ECONOMIC SYSTEM
@@ -355,37 +410,27 @@ class GameBoard:
     
     def buy_unit(self, x, y, unit, dimensions):
         """Purchase and place a unit"""
-        test_unit = statreader.unitFromStatsheet('statsheets/' + unit, self.player_acting)
-        if self.player_acting.getMoney() >= test_unit.getCost():
+        cost = statreader.cost_of(unit)
+        if self.player_acting.getMoney() >= cost:
+            if self.recorder:
+                self.recorder.buy(x, y, unit, dimensions)
             self.initialize_unit(x, y, 'statsheets/' + unit, self.player_acting.getTeam(), dimensions)
-            self.player_acting.spendMoney(test_unit.getCost())
+            self.player_acting.spendMoney(cost)
             return True
         else:
-            del test_unit
             return False
     
     def do_income(self, player):
-        """Calculate and apply income for a player"""
-        income = 0
-        for unit in self.units_of_player(player):
-            if not(unit.is_under_construction()):
-                income += unit.getProduction()
-        for coords in mines.mineCoords:
-            mine = self.tile_at(coords[0], coords[1])
-            if mine.get_unit():
-                if mine.get_unit().getPlayer() == player:
-                    income += 1
-        player.makeIncome(income)      
+        """Apply a player's income"""
+        player.makeIncome(self.income.income_of(player))
+
+    def projected_income(self, player):
+        """Income the player will collect at the start of their next turn"""
+        return self.income.income_of(player)
 
     def units_of_player(self, player: player.Player) -> list:
         """Get all units belonging to a player"""
-        unit_list = []
-        for y in self.tiles:
-            for tile in y:
-                if tile.get_unit():
-                    if tile.get_unit().getPlayer() == player:
-                        unit_list.append(tile.get_unit())
-        return unit_list
+        return [tile.get_unit() for tile in self.storage.occupied() if tile.get_unit().getPlayer() == player]
     
     # ==========================================================================
     # UTILITY METHODS
@@ -433,7 +478,7 @@ class GameBoard:
                 def click_function(statsheet_name):
                     def production_function(self, x, y):
                         if self.buy_unit(x, y, statsheet_name, dimensions) and self.selected_tile.get_unit().getName().lower() == 'builder':
-                            self.selected_tile.get_unit().do_action()
+                            self.spend_action(self.selected_tile)
                         self.click_state = 'choosing action'
                     self.production_function = production_function
                     self.click_state = 'producing unit or acting'
@@ -459,7 +504,7 @@ class GameBoard:
                 def click_function(statsheet_name):
                     def production_function(self, x, y):
                         if self.buy_unit(x, y, statsheet_name, dimensions) and self.selected_tile.get_unit().getName().lower() == 'builder':
-                            self.selected_tile.get_unit().do_action()
+                            self.spend_action(self.selected_tile)
                         self.click_state = 'choosing action'
                     self.production_function = production_function
                     self.click_state = 'producing unit or acting'
@@ -506,13 +551,15 @@ class GameBoard:
         return self.turn_count
     
     def get_units(self) -> iter:
-        for row in self.tiles:
-            for tile in row:
-                if tile.get_unit():
-                    yield tile.get_unit()
+        for tile in self.storage.occupied():
+            yield tile.get_unit()
+
+    def occupied_tiles(self) -> list:
+        """Tiles with a unit on them, in row order"""
+        return self.storage.occupied()
 
     def tile_of_unit(self, unit: unit.Unit) -> None:
-        for row in self.tiles:
-            for tile in row:
-                if tile.get_unit() == unit:
-                    return tile
\ No newline at end of file
+        tile = unit.tile
+        if tile is not None and tile.get_unit() is unit and tile.storage is self.storage:
+            return tile
+        return None
\ No newline at end of file
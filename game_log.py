@@ -0,0 +1,64 @@
+# Leveled game-event logging on top of the standard logging module.
+# Events are logged per category ('game.status', 'game.turn', ...) with
+# %-style arguments, so nothing is formatted unless a handler will see it.
+# With no route set up the log is silent, which is what headless runs want.
+import logging
+import sys
+from collections import deque
+
+ROOT = 'game'
+CATEGORIES = ('status', 'turn', 'ai', 'render')
+FORMAT = '%(levelname)s %(name)s: %(message)s'
+
+_root = logging.getLogger(ROOT)
+_root.propagate = False
+
+
+def logger(category):
+    """Logger for one category of game events"""
+    return logging.getLogger(f'{ROOT}.{category}')
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the most recent records in memory, for inspecting a simulation afterwards"""
+    def __init__(self, capacity=1000):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def messages(self):
+        return [record.getMessage() for record in self.records]
+
+
+def route(handler, level=logging.INFO):
+    """Send game events at level and above to handler only, replacing the previous route"""
+    for old_handler in list(_root.handlers):
+        _root.removeHandler(old_handler)
+        old_handler.close()
+    if handler.formatter is None:
+        handler.setFormatter(logging.Formatter(FORMAT))
+    _root.addHandler(handler)
+    _root.setLevel(level)
+    return handler
+
+def log_to_console(level=logging.INFO):
+    return route(logging.StreamHandler(), level)
+
+def log_to_file(path, level=logging.INFO):
+    return route(logging.FileHandler(path), level)
+
+def log_to_ring_buffer(capacity=1000, level=logging.DEBUG):
+    return route(RingBufferHandler(capacity), level)
+
+def log_warnings(level=logging.WARNING):
+    """Warnings and errors to stderr, quieter events dropped"""
+    return route(logging.StreamHandler(sys.stderr), level)
+
+def log_to_nothing():
+    """Drop every game event; the default"""
+    route(logging.NullHandler(), logging.CRITICAL + 1)
+
+
+log_to_nothing()
@@ -1,13 +1,44 @@
 import colors
 import pygame
 
-class Healthbar(object):
-    def __init__(self, unit):
-        self.unit = unit
-
-    def draw_healthbar(self, screen, tiledimensions, unit):
-        left = (self.unit.get_x() * tiledimensions) + (2 * tiledimensions)/16
-        top = (self.unit.get_y() * tiledimensions) + (2 * tiledimensions)/16
-        if unit.getHp() < unit.getMaxHp():
-            pygame.draw.rect(screen, colors.COLORS.RED, (left, top, tiledimensions * 0.75, tiledimensions * 0.10))
-            pygame.draw.rect(screen, colors.COLORS.GREEN, (left, top, tiledimensions * (unit.getHp()/unit.getMaxHp()) * 0.75, tiledimensions * 0.10))
\ No newline at end of file
+class HealthbarLayer(object):
+    """Health bars of every damaged unit, kept on one transparent surface over the board"""
+    def __init__(self):
+        self.surface = None
+        self.tiledimensions = 0
+        # (x, y) -> (hp, maxHp) of the bar currently drawn on that tile
+        self.bars = {}
+
+    def resize(self, width, height, tiledimensions):
+        self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.tiledimensions = tiledimensions
+        self.bars = {}
+
+    def bar_rect(self, x, y):
+        left = (x * self.tiledimensions) + (2 * self.tiledimensions)/16
+        top = (y * self.tiledimensions) + (2 * self.tiledimensions)/16
+        return left, top, self.tiledimensions * 0.75, self.tiledimensions * 0.10
+
+    def update(self, x, y, unit):
+        """Redraw the bar on a tile if its unit's hp changed; returns whether it did"""
+        bar = None
+        if unit and unit.getHp() < unit.getMaxHp():
+            bar = (unit.getHp(), unit.getMaxHp())
+        if self.bars.get((x, y)) == bar:
+            return False
+        left, top, width, height = self.bar_rect(x, y)
+        pygame.draw.rect(self.surface, (0, 0, 0, 0), (left, top, width, height))
+        if bar:
+            pygame.draw.rect(self.surface, colors.COLORS.RED, (left, top, width, height))
+            pygame.draw.rect(self.surface, colors.COLORS.GREEN, (left, top, width * (bar[0]/bar[1]), height))
+            self.bars[(x, y)] = bar
+        else:
+            del self.bars[(x, y)]
+        return True
+
+    def has_bar(self, x, y):
+        return (x, y) in self.bars
+
+    def draw(self, screen, rect):
+        """Copy the part of the layer inside rect onto the screen"""
+        screen.blit(self.surface, rect, rect)
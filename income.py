@@ -0,0 +1,35 @@
+# Per-player income, kept current as units enter, leave, finish or change owner
+# on board tiles, so collecting it at the start of a turn is a dictionary lookup
+
+class IncomeLedger(object):
+    """Income each player collects per turn, from producers and occupied mines"""
+    def __init__(self, game_map):
+        # GameMap the mine positions are read from
+        self.game_map = game_map
+        # tile -> (player, income) of the unit standing on that tile
+        self.contributions = {}
+        # player -> income
+        self.totals = {}
+
+    def tile_income(self, tile):
+        """The player the unit on a tile earns for, and how much"""
+        unit = tile.unit
+        if unit is None:
+            return None, 0
+        income = 0 if unit.is_under_construction() else unit.getProduction()
+        if self.game_map.is_mine(tile.x, tile.y):
+            income += 1
+        return unit.player, income
+
+    def refresh(self, tile):
+        """Recount a tile after its unit changed"""
+        old_player, old_income = self.contributions.pop(tile, (None, 0))
+        if old_income:
+            self.totals[old_player] -= old_income
+        player, income = self.tile_income(tile)
+        if income:
+            self.contributions[tile] = (player, income)
+            self.totals[player] = self.totals.get(player, 0) + income
+
+    def income_of(self, player):
+        return self.totals.get(player, 0)
@@ -4,14 +4,22 @@ from game_board import GameBoard
 from board_renderer import BoardRenderer
 import statreader
 import ai
+import game_log
+import maps
+import seeding
 from colors import COLORS
 
 # Game Constants
 FPS = 60
+# Block on input between frames instead of redrawing at FPS while nothing is happening
+EVENT_DRIVEN = True
+# Longest an idle event-driven loop sleeps before checking for work again
+IDLE_TIMEOUT_MS = 500
 WINDOW_TITLE = "Strategy Game"
 TILE_SIZE = 30
-BOARD_WIDTH = 10
-BOARD_HEIGHT = 20
+MAP_FILE = maps.DEFAULT_MAP
+# Master seed of the game's random streams; None picks a new one every game
+SEED = None
 
 class StrategyGame:
     """Main game class using the new split architecture"""
@@ -20,12 +28,13 @@ class StrategyGame:
         """Initialize the game with separate logic and rendering"""
         pygame.init()
         pygame.display.set_caption(WINDOW_TITLE)
+        # Show game events in the terminal while playing
+        game_log.log_to_console()
         
-        # Create game logic (no pygame dependencies)
-        self.game_board = GameBoard(
-            width=BOARD_WIDTH, 
-            height=BOARD_HEIGHT
-        )
+        # Create game logic (no pygame dependencies), laid out by the map file
+        self.game_map = maps.GameMap.open(MAP_FILE)
+        self.seed = seeding.new_seed() if SEED is None else SEED
+        self.game_board = GameBoard(game_map=self.game_map, seed=self.seed)
 
         # Create renderer (handles all pygame/visual stuff)
         self.renderer = BoardRenderer(self.game_board, TILE_SIZE)
@@ -33,67 +42,58 @@ class StrategyGame:
         # Game state
         self.clock = pygame.time.Clock()
         self.running = True
+        self.event_driven = EVENT_DRIVEN
+        # Screen rectangles redrawn by the renderer this frame
+        self.dirty_rects = []
         
         # Initialize game scenario
-        self.setup_castle_scenario()
+        self.setup_scenario()
         
         print("Strategy Game Initialized!")
     
-    def setup_castle_scenario(self):
-        """Set up the classic castle vs castle scenario"""
-        # Player 0 (Blue team) - Bottom castle
-        self._build_castle(player_id=0, castle_y=0, wall_y=3, gate_y=3, archer_y=1)
+    def setup_scenario(self):
+        """Place the map's starting units, the classic castle vs castle scenario by default"""
+        self.game_board.place_starting_units(TILE_SIZE)
         
-        # Player 1 (Red team) - Top castle  
-        self._build_castle(player_id=1, castle_y=19, wall_y=16, gate_y=16, archer_y=18)
-        
-        print("Castle scenario loaded!")
+        print(f"Map {MAP_FILE} loaded with seed {self.seed}!")
         print(f"Player 0 (Blue): {self.game_board.get_player_num(0).getMoney()} gold")
         print(f"Player 1 (Red): {self.game_board.get_player_num(1).getMoney()} gold")
 
         # Register a simple heuristic AI for Player 1 (Red)
         # You can toggle this or register different AI controllers as needed
         self.game_board.get_player_num(1).setIsAI(True)
-        self.game_board.register_ai(self.game_board.get_player_num(1), ai.HeuristicAI(self.game_board.get_player_num(1)))
-    
-    def _build_castle(self, player_id, castle_y, wall_y, gate_y, archer_y):
-        """Helper to build one player's castle complex"""
-        # Main wall (6 tiles wide)
-        for i in range(6):
-            self.game_board.initialize_unit(i+2, wall_y, 'statsheets/Wall.txt', player_id, prebuilt=True, tile_dimensions=30)
-        
-        # Side walls (3 tiles high on each side)
-        wall_start_y = 0 if player_id == 0 else 17
-        for i in range(3):
-            self.game_board.initialize_unit(2, wall_start_y + i, 'statsheets/Wall.txt', player_id, prebuilt=True, tile_dimensions=30)
-            self.game_board .initialize_unit(7, wall_start_y + i, 'statsheets/Wall.txt', player_id, prebuilt=True, tile_dimensions=30)
-        
-        # Gates (2 tiles for entrance)
-        self.game_board.initialize_unit(4, gate_y, 'statsheets/Gate.txt', player_id, prebuilt=True, tile_dimensions=30)
-        self.game_board.initialize_unit(5, gate_y, 'statsheets/Gate.txt', player_id, prebuilt=True, tile_dimensions=30)
-        
-        # Defensive archer
-        self.game_board.initialize_unit(5, archer_y, 'statsheets/Archer.txt', player_id, tile_dimensions=30)
-        
-        # Castle (command center) and Farm (economy)
-        self.game_board.initialize_unit(5, castle_y, 'statsheets/Castle.txt', player_id, prebuilt=True, tile_dimensions=30)
-        self.game_board.initialize_unit(4, castle_y, 'statsheets/Farm.txt', player_id, prebuilt=True, tile_dimensions=30)
+        self.game_board.register_ai(self.game_board.get_player_num(1),
+                                    ai.HeuristicAI(self.game_board.get_player_num(1), self.game_board.random_stream('ai', 1),
+                                                   self.game_board.mine_coords))
     
     def handle_events(self):
         """Process all pygame events"""
         for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.shutdown()
-            
-            elif event.type == pygame.KEYDOWN:
-                self.handle_keypress(event.key)
-            
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                self.handle_mouse_click(event.pos, event.button)
-            
-            elif event.type == pygame.VIDEORESIZE:
-                self.handle_resize()
-    
+            self.handle_event(event)
+
+    def handle_event(self, event):
+        """Process a single pygame event"""
+        if event.type == pygame.QUIT:
+            self.shutdown()
+        
+        elif event.type == pygame.KEYDOWN:
+            self.handle_keypress(event.key)
+        
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            self.handle_mouse_click(event.pos, event.button)
+        
+        elif event.type == pygame.VIDEORESIZE:
+            self.handle_resize()
+
+        elif event.type == pygame.VIDEOEXPOSE:
+            self.renderer.full_redraw = True
+
+    def wait_for_events(self):
+        """Sleep until input arrives or the idle timeout passes"""
+        event = pygame.event.wait(IDLE_TIMEOUT_MS)
+        if event.type != pygame.NOEVENT:
+            self.handle_event(event)
+
     def handle_keypress(self, key):
         """Handle keyboard input"""
         if key == pygame.K_SPACE:
@@ -107,10 +107,13 @@ class StrategyGame:
         
         elif key == pygame.K_h:
             self.show_help()
+
+        elif key == pygame.K_F3:
+            self.renderer.toggle_profiler()
         
         else:
             try:
-                self.renderer.UI.handle_keypress(chr(key))
+                self.renderer.handle_keypress(chr(key))
             except:
                 print(str(key) + " (not convertible to character via ascii)")
 
@@ -136,6 +139,8 @@ class StrategyGame:
     def restart_game(self):
         """Restart the game"""
         print("Restarting game...")
+        self.renderer.profiler.close()
+        self.game_map.close()
         self.__init__()
     
     def show_help(self):
@@ -150,6 +155,7 @@ class StrategyGame:
         print("  SPACE    - Next turn")
         print("  L        - Restart game")
         print("  H        - Show help")
+        print("  F3       - Toggle frame profiler")
         print("  ESC      - Quit game")
         print("="*40 + "\n")
     
@@ -171,11 +177,12 @@ class StrategyGame:
     
     def update_visuals(self):
         """Update all visual elements"""
-        self.renderer.update_all()
+        self.dirty_rects = self.renderer.update_all()
     
     def render(self):
-        """Render everything to screen"""
-        pygame.display.flip()
+        """Push the changed parts of the frame to the screen"""
+        if self.dirty_rects:
+            pygame.display.update(self.dirty_rects)
     
     def run(self):
         """Main game loop"""
@@ -187,14 +194,17 @@ class StrategyGame:
                 # Handle input
                 self.handle_events()
                 
-                # Update visuals
-                self.update_visuals()
-                
-                # Render to screen
-                self.render()
+                # Redraw only when something changed
+                if self.renderer.is_dirty():
+                    self.update_visuals()
+                    self.render()
                 
-                # Control frame rate
-                self.clock.tick(FPS)
+                # Sleep until the next input, otherwise control frame rate. AI turns
+                # run to completion inside next_turn, so there is never work to wait on
+                if self.event_driven:
+                    self.wait_for_events()
+                else:
+                    self.clock.tick(FPS)
                 
         except KeyboardInterrupt:
             print("\nGame interrupted by user")
@@ -212,6 +222,8 @@ class StrategyGame:
     
     def cleanup(self):
         """Clean up resources"""
+        self.renderer.profiler.close()
+        self.game_map.close()
         pygame.quit()
         print("Game closed successfully")
         sys.exit()
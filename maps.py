@@ -0,0 +1,184 @@
+# maps.py - Binary map files: a header, then packed terrain, objective and starting-unit layers
+#
+# Layout, little-endian:
+#   header       magic b'SGMP', version u16, width u16, height u16, unit type count u16,
+#                starting unit count u32
+#   unit types   per type: name length u8, statsheet file name (utf-8)
+#   terrain      one u8 per cell, row by row; 0 is open ground
+#   objectives   one u8 per cell, row by row; OBJECTIVE_MINE marks a mine
+#   units        per unit: x u16, y u16, type u16, player u8, flags u8
+#
+# Files are memory-mapped, so opening a large map reads only the header and
+# cells are paged in as they are looked at.
+import mmap
+import struct
+import mines
+
+MAGIC = b'SGMP'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHHI')
+UNIT_RECORD = struct.Struct('<HHHBB')
+
+TERRAIN_OPEN = 0
+OBJECTIVE_NONE = 0
+OBJECTIVE_MINE = 1
+# Starting unit flags
+PREBUILT = 1
+
+DEFAULT_MAP = 'maps/castle.map'
+
+
+class MapFormatError(ValueError):
+    pass
+
+
+class StartingUnit(object):
+    __slots__ = ('x', 'y', 'statsheet', 'player', 'prebuilt')
+
+    def __init__(self, x, y, statsheet, player, prebuilt=False):
+        self.x = x
+        self.y = y
+        self.statsheet = statsheet
+        self.player = player
+        self.prebuilt = prebuilt
+
+
+class GameMap(object):
+    """Read-only view of a map held in a buffer, usually a memory-mapped file"""
+
+    def __init__(self, buffer, source=None):
+        self.buffer = buffer
+        self.source = source
+        self.file = None
+        magic, version, self.width, self.height, type_count, self.unit_count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise MapFormatError(f'{source} is not a map file')
+        if version != VERSION:
+            raise MapFormatError(f'{source} has map format version {version}, expected {VERSION}')
+        offset = HEADER.size
+        self.unit_types = []
+        for i in range(type_count):
+            length = buffer[offset]
+            self.unit_types.append(bytes(buffer[offset + 1:offset + 1 + length]).decode('utf-8'))
+            offset += 1 + length
+        cells = self.width * self.height
+        self.terrain_offset = offset
+        self.objective_offset = offset + cells
+        self.units_offset = offset + 2 * cells
+        if len(buffer) < self.units_offset + self.unit_count * UNIT_RECORD.size:
+            raise MapFormatError(f'{source} is truncated')
+        self._objectives = None
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a map file"""
+        file = open(path, 'rb')
+        try:
+            game_map = cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ), path)
+        except Exception:
+            file.close()
+            raise
+        game_map.file = file
+        return game_map
+
+    @classmethod
+    def blank(cls, width, height, objectives=()):
+        """An in-memory map with open ground, the given mines and no units"""
+        objectives = [(x, y) for x, y in objectives if 0 <= x < width and 0 <= y < height]
+        return cls(pack(width, height, objectives=objectives))
+
+    def close(self):
+        if self.file:
+            self.buffer.close()
+            self.file.close()
+            self.file = None
+
+    def terrain_at(self, x, y):
+        return self.buffer[self.terrain_offset + y * self.width + x]
+
+    def objective_at(self, x, y):
+        return self.buffer[self.objective_offset + y * self.width + x]
+
+    def is_mine(self, x, y):
+        return self.objective_at(x, y) == OBJECTIVE_MINE
+
+    def objective_coords(self):
+        """Coordinates of every mine, in row order"""
+        if self._objectives is None:
+            coords = []
+            start, end = self.objective_offset, self.objective_offset + self.width * self.height
+            position = self.buffer.find(bytes([OBJECTIVE_MINE]), start, end)
+            while position != -1:
+                cell = position - start
+                coords.append((cell % self.width, cell // self.width))
+                position = self.buffer.find(bytes([OBJECTIVE_MINE]), position + 1, end)
+            self._objectives = coords
+        return self._objectives
+
+    def starting_units(self):
+        """Units placed when a game starts, in file order"""
+        for i in range(self.unit_count):
+            x, y, type_id, player, flags = UNIT_RECORD.unpack_from(self.buffer, self.units_offset + i * UNIT_RECORD.size)
+            yield StartingUnit(x, y, self.unit_types[type_id], player, bool(flags & PREBUILT))
+
+
+def pack(width, height, terrain=None, objectives=(), units=()):
+    """Encode a map; terrain is a {(x, y): id} dict, objectives mine coordinates,
+    units StartingUnits"""
+    unit_types = []
+    for starting_unit in units:
+        if starting_unit.statsheet not in unit_types:
+            unit_types.append(starting_unit.statsheet)
+    data = bytearray(HEADER.pack(MAGIC, VERSION, width, height, len(unit_types), len(units)))
+    for name in unit_types:
+        encoded = name.encode('utf-8')
+        data.append(len(encoded))
+        data += encoded
+    terrain_layer = bytearray(width * height)
+    for (x, y), terrain_id in (terrain or {}).items():
+        terrain_layer[y * width + x] = terrain_id
+    objective_layer = bytearray(width * height)
+    for x, y in objectives:
+        objective_layer[y * width + x] = OBJECTIVE_MINE
+    data += terrain_layer
+    data += objective_layer
+    for starting_unit in units:
+        data += UNIT_RECORD.pack(starting_unit.x, starting_unit.y, unit_types.index(starting_unit.statsheet),
+                                 starting_unit.player, PREBUILT if starting_unit.prebuilt else 0)
+    return data
+
+def save(path, width, height, terrain=None, objectives=(), units=()):
+    with open(path, 'wb') as file:
+        file.write(pack(width, height, terrain, objectives, units))
+
+
+def castle_units(player, castle_y, wall_y, gate_y, archer_y):
+    """One player's castle complex of the classic castle vs castle map"""
+    units = []
+    # Main wall (6 tiles wide)
+    for i in range(6):
+        units.append(StartingUnit(i + 2, wall_y, 'Wall.txt', player, prebuilt=True))
+    # Side walls (3 tiles high on each side)
+    wall_start_y = 0 if player == 0 else 17
+    for i in range(3):
+        units.append(StartingUnit(2, wall_start_y + i, 'Wall.txt', player, prebuilt=True))
+        units.append(StartingUnit(7, wall_start_y + i, 'Wall.txt', player, prebuilt=True))
+    # Gates (2 tiles for entrance)
+    units.append(StartingUnit(4, gate_y, 'Gate.txt', player, prebuilt=True))
+    units.append(StartingUnit(5, gate_y, 'Gate.txt', player, prebuilt=True))
+    # Defensive archer
+    units.append(StartingUnit(5, archer_y, 'Archer.txt', player))
+    # Castle (command center) and Farm (economy)
+    units.append(StartingUnit(5, castle_y, 'Castle.txt', player, prebuilt=True))
+    units.append(StartingUnit(4, castle_y, 'Farm.txt', player, prebuilt=True))
+    return units
+
+def save_castle_map(path=DEFAULT_MAP):
+    """Write the classic castle vs castle map"""
+    units = castle_units(0, castle_y=0, wall_y=3, gate_y=3, archer_y=1)
+    units += castle_units(1, castle_y=19, wall_y=16, gate_y=16, archer_y=18)
+    save(path, 10, 20, objectives=mines.mineCoords, units=units)
+
+
+if __name__ == '__main__':
+    save_castle_map()
@@ -0,0 +1,109 @@
+import os
+import time
+from collections import deque
+
+# Stages of BoardRenderer.update_all, in the order they are drawn in the overlay
+STAGES = ('reset_tiles', 'highlights', 'color_tiles', 'healthbars', 'production actions', 'player info', 'hotkeys')
+# Frames kept for the averages and percentiles
+HISTORY = 240
+
+
+class _NullStage(object):
+    """Stage timer used while profiling is off; does nothing"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_STAGE = _NullStage()
+
+
+class _Stage(object):
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.current[self.name] = self.profiler.current.get(self.name, 0) + time.perf_counter() - self.start
+        return False
+
+
+class FrameProfiler(object):
+    """Times each stage of a rendered frame and counts draw calls and blits"""
+
+    def __init__(self, log_path='frame_profile.csv'):
+        self.enabled = False
+        self.log_path = log_path
+        self.log_file = None
+        self.frame_times = deque(maxlen=HISTORY)
+        self.stage_times = {stage: deque(maxlen=HISTORY) for stage in STAGES}
+        self.current = {}
+        self.counts = {'draws': 0, 'blits': 0}
+        self.last_counts = dict(self.counts)
+        self.frame_start = 0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        if self.enabled and self.log_path:
+            self.log_file = open(self.log_path, 'a')
+            # Header only at the top of a new file; re-enabling appends more rows under it
+            if os.path.getsize(self.log_path) == 0:
+                self.log_file.write('frame_ms,' + ','.join(STAGES) + ',draws,blits\n')
+        else:
+            self.close()
+        return self.enabled
+
+    def close(self):
+        """Close the CSV log, if profiling left it open"""
+        if self.log_file:
+            self.log_file.close()
+            self.log_file = None
+
+    def stage(self, name):
+        """Context manager timing one stage of the current frame"""
+        if not self.enabled:
+            return NULL_STAGE
+        return _Stage(self, name)
+
+    def count(self, kind, amount=1):
+        if self.enabled:
+            self.counts[kind] += amount
+
+    def begin_frame(self):
+        if self.enabled:
+            self.current = {}
+            self.counts = {'draws': 0, 'blits': 0}
+            self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        frame_time = time.perf_counter() - self.frame_start
+        self.frame_times.append(frame_time)
+        for stage in STAGES:
+            self.stage_times[stage].append(self.current.get(stage, 0))
+        self.last_counts = self.counts
+        if self.log_file:
+            stages = ','.join(f'{self.current.get(stage, 0) * 1000:.3f}' for stage in STAGES)
+            self.log_file.write(f'{frame_time * 1000:.3f},{stages},{self.counts["draws"]},{self.counts["blits"]}\n')
+
+    def percentile(self, fraction):
+        """Frame time in ms below which the given fraction of recent frames fall"""
+        if not self.frame_times:
+            return 0
+        ordered = sorted(self.frame_times)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    def summary_lines(self):
+        lines = [f'frame p50 {self.percentile(0.5):.2f} p90 {self.percentile(0.9):.2f} p99 {self.percentile(0.99):.2f} ms']
+        for stage in STAGES:
+            times = self.stage_times[stage]
+            average = sum(times) / len(times) * 1000 if times else 0
+            lines.append(f'{stage}: {average:.2f} ms')
+        lines.append(f'draws {self.last_counts["draws"]} blits {self.last_counts["blits"]}')
+        return lines
@@ -0,0 +1,159 @@
+# replay.py - Append-only replay files of every command applied to a GameBoard
+#
+# Layout, little-endian:
+#   header       magic b'SGRP', version u16, keyframe interval u16 (turns)
+#   records      kind u8, payload length u32, payload
+#
+# A keyframe record holds the half-turn count (u32) followed by a savegame
+# snapshot of the board at the start of that turn. A keyframe is written when
+# recording starts and then every `interval` turns, so seeking loads the nearest
+# earlier keyframe and replays only the commands after it.
+import struct
+import savegame
+
+MAGIC = b'SGRP'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')
+RECORD = struct.Struct('<BI')
+TILES = struct.Struct('<HHHH')
+MOVE = struct.Struct('<HHHHb')
+BUY = struct.Struct('<HHH')
+TILE = struct.Struct('<HH')
+TURN = struct.Struct('<I')
+
+KEYFRAME, MOVE_COMMAND, ATTACK, BUILD, BUY_COMMAND, ACTION, NEXT_TURN = range(7)
+KEYFRAME_INTERVAL = 10
+
+
+class ReplayFormatError(ValueError):
+    pass
+
+
+class ReplayRecorder(object):
+    """Streams a board's commands to a replay file; attach with GameBoard.record_to"""
+
+    def __init__(self, path, interval=KEYFRAME_INTERVAL):
+        self.file = open(path, 'wb')
+        self.interval = interval
+        self.last_keyframe = None
+        self.file.write(HEADER.pack(MAGIC, VERSION, interval))
+
+    def write(self, kind, payload=b''):
+        self.file.write(RECORD.pack(kind, len(payload)))
+        self.file.write(payload)
+
+    def keyframe(self, board):
+        half_turns = int(board.get_turn() * 2)
+        self.write(KEYFRAME, TURN.pack(half_turns) + savegame.pack(board))
+        self.last_keyframe = half_turns
+
+    def turn_started(self, board):
+        """Write a keyframe if enough turns have passed since the last one"""
+        if int(board.get_turn() * 2) - self.last_keyframe >= self.interval * 2:
+            self.keyframe(board)
+
+    def move(self, start, destination):
+        unit = start.get_unit()
+        active = unit.carrying.index(start.get_active_unit()) if start.get_active_unit() is not unit else -1
+        self.write(MOVE_COMMAND, MOVE.pack(start.get_x(), start.get_y(), destination.get_x(), destination.get_y(), active))
+
+    def attack(self, start, target):
+        self.write(ATTACK, TILES.pack(start.get_x(), start.get_y(), target.get_x(), target.get_y()))
+
+    def build(self, builder, target):
+        self.write(BUILD, TILES.pack(builder.get_x(), builder.get_y(), target.get_x(), target.get_y()))
+
+    def buy(self, x, y, unit, dimensions):
+        self.write(BUY_COMMAND, BUY.pack(x, y, dimensions) + unit.encode('utf-8'))
+
+    def action(self, tile):
+        self.write(ACTION, TILE.pack(tile.get_x(), tile.get_y()))
+
+    def next_turn(self):
+        self.write(NEXT_TURN)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ReplayReader(object):
+    """Reads a replay file record by record, so long replays are never loaded whole"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        magic, version, self.interval = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC:
+            raise ReplayFormatError(f'{path} is not a replay file')
+        if version != VERSION:
+            raise ReplayFormatError(f'{path} has replay format version {version}, expected {VERSION}')
+        # (half turns, record offset) of every keyframe, found by skipping over the payloads
+        self.keyframes = []
+        for kind, offset, length in self.records(HEADER.size, read_payload=False):
+            if kind == KEYFRAME:
+                self.keyframes.append((TURN.unpack(self.file.read(TURN.size))[0], offset - RECORD.size))
+
+    def records(self, offset, read_payload=True):
+        """Yield (kind, offset, payload) from offset on; payload is its length if not read"""
+        while True:
+            self.file.seek(offset)
+            header = self.file.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            kind, length = RECORD.unpack(header)
+            payload_offset = offset + RECORD.size
+            offset = payload_offset + length
+            if read_payload:
+                payload = self.file.read(length)
+                if len(payload) < length:
+                    return
+                yield kind, payload_offset, payload
+            else:
+                yield kind, payload_offset, length
+
+    def seek(self, turn):
+        """The board as it was at the start of a turn: the nearest keyframe at or before it,
+        with the commands recorded after that keyframe applied"""
+        half_turns = int(turn * 2)
+        start = None
+        for keyframe_turn, offset in self.keyframes:
+            if keyframe_turn > half_turns:
+                break
+            start = offset
+        if start is None:
+            raise ValueError(f'replay has no keyframe at or before turn {turn}')
+        kind, offset, payload = next(self.records(start))
+        board = savegame.unpack(payload[TURN.size:])
+        for kind, offset, payload in self.records(offset + len(payload)):
+            if board.get_turn() * 2 >= half_turns:
+                break
+            apply(board, kind, payload)
+        return board
+
+    def close(self):
+        self.file.close()
+
+
+def apply(board, kind, payload):
+    """Apply one recorded command to a board"""
+    if kind == MOVE_COMMAND:
+        x, y, to_x, to_y, active = MOVE.unpack(payload)
+        start = board.tile_at(x, y)
+        if active >= 0:
+            start.set_active_unit(active)
+        board.move(start, board.tile_at(to_x, to_y))
+    elif kind == ATTACK:
+        x, y, to_x, to_y = TILES.unpack(payload)
+        board.attack(board.tile_at(x, y), board.tile_at(to_x, to_y))
+    elif kind == BUILD:
+        x, y, to_x, to_y = TILES.unpack(payload)
+        board.build(board.tile_at(x, y), board.tile_at(to_x, to_y))
+    elif kind == BUY_COMMAND:
+        x, y, dimensions = BUY.unpack_from(payload)
+        board.buy_unit(x, y, payload[BUY.size:].decode('utf-8'), dimensions)
+    elif kind == ACTION:
+        board.spend_action(board.tile_at(*TILE.unpack(payload)))
+    elif kind == NEXT_TURN:
+        board.next_turn()
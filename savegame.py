@@ -0,0 +1,209 @@
+# savegame.py - Compact binary snapshots of a whole game
+#
+# Layout, little-endian:
+#   header        magic b'SGSV', version u16, width u16, height u16, half turns u32,
+#                 master seed u64, acting player u8, click state u8, mine count u32, unit type count u16,
+#                 status effect count u16, occupied tile count u32
+#   players       per player: money i32, is ai u8
+#   selection     selected, second selected, targeted and building tile: x i16, y i16 (-1 for none)
+#   mines         per mine: x u16, y u16
+#   unit types    per type: name length u8, statsheet file name (utf-8)
+#   effects       per effect: id length u8, status effect id (utf-8)
+#   tiles         per occupied tile: x u16, y u16, active carried unit i8 (-1 for the unit itself),
+#                 then its unit
+#   unit          type u16, player u8 (255 for none), hp i16, attacks i16, has moved u8,
+#                 in progress u8, build progress i16, effect count u8, carried count u8,
+#                 then per effect: effect u16, duration i16, stacks u16,
+#                 then each carried unit
+#
+# Units and effects are stored by id, so loading rebuilds them from the shared
+# templates and definitions instead of storing stats or images.
+import struct
+import game_board
+import maps
+import statreader
+import status_effects
+from status_effects import Status_Effect
+
+MAGIC = b'SGSV'
+VERSION = 2
+HEADER = struct.Struct('<4sHHHIQBBIHHI')
+PLAYER = struct.Struct('<iB')
+SELECTION = struct.Struct('<hhhhhhhh')
+COORDS = struct.Struct('<HH')
+TILE = struct.Struct('<HHb')
+UNIT = struct.Struct('<HBhhBBhBB')
+EFFECT = struct.Struct('<HhH')
+
+# Click states a game can be saved in. A pending production choice is a closure,
+# so a game saved while producing loads back to choosing an action.
+CLICK_STATES = ('nothing selected', 'choosing action', 'confirming movement', 'confirming attack',
+                'confirming build', 'enemy unit selected', 'producing unit or acting')
+NO_PLAYER = 255
+
+
+class SaveFormatError(ValueError):
+    pass
+
+
+def _names(names):
+    data = bytearray()
+    for name in names:
+        encoded = name.encode('utf-8')
+        data.append(len(encoded))
+        data += encoded
+    return data
+
+def _read_names(data, offset, count):
+    names = []
+    for i in range(count):
+        length = data[offset]
+        names.append(bytes(data[offset + 1:offset + 1 + length]).decode('utf-8'))
+        offset += 1 + length
+    return names, offset
+
+def _coords_of(tile):
+    return (tile.get_x(), tile.get_y()) if tile else (-1, -1)
+
+
+class _Writer(object):
+    """Assigns ids to unit types and effects while encoding units"""
+    def __init__(self):
+        self.unit_types = {}
+        self.effects = {}
+        self.effect_ids = {definition: effect_id for effect_id, definition in status_effects.STATUS_EFFECTS.items()}
+
+    def type_id(self, unit):
+        return self.unit_types.setdefault(unit.getStatsheetName(), len(self.unit_types))
+
+    def effect_id(self, effect):
+        effect_id = self.effect_ids.get(effect.definition)
+        if effect_id is None:
+            raise SaveFormatError(f'{effect.get_name()} is not a registered status effect')
+        return self.effects.setdefault(effect_id, len(self.effects))
+
+    def unit(self, data, unit):
+        data += UNIT.pack(self.type_id(unit), unit.player.getTeam() if unit.player else NO_PLAYER,
+                          unit.hp, unit.attacks, unit.hasMoved, unit.inProgress,
+                          getattr(unit, 'buildProgress', 0), len(unit.status_effects), len(unit.carrying))
+        for effect in unit.status_effects:
+            data += EFFECT.pack(self.effect_id(effect), effect.duration, effect.stacks)
+        for carried in unit.carrying:
+            self.unit(data, carried)
+
+
+def pack(board):
+    """Encode the state of a board as bytes"""
+    writer = _Writer()
+    units = bytearray()
+    occupied = board.occupied_tiles()
+    for tile in occupied:
+        unit = tile.get_unit()
+        active = unit.carrying.index(tile.get_active_unit()) if tile.get_active_unit() is not unit else -1
+        units += TILE.pack(tile.get_x(), tile.get_y(), active)
+        writer.unit(units, unit)
+
+    click_state = board.get_click_state()
+    if click_state not in CLICK_STATES:
+        raise SaveFormatError(f'cannot save in click state {click_state}')
+    data = bytearray(HEADER.pack(
+        MAGIC, VERSION, board.get_width(), board.get_height(), int(board.get_turn() * 2), board.seed,
+        board.get_player_acting().getTeam(), CLICK_STATES.index(click_state), len(board.mine_coords),
+        len(writer.unit_types), len(writer.effects), len(occupied)))
+    for player in (board.get_player_num(0), board.get_player_num(1)):
+        data += PLAYER.pack(player.getMoney(), player.isAI())
+    data += SELECTION.pack(*_coords_of(board.get_selected_tile()), *_coords_of(board.get_second_selected_tile()),
+                           *_coords_of(board.get_targeted_tile()), *_coords_of(board.get_building_tile()))
+    for x, y in board.mine_coords:
+        data += COORDS.pack(x, y)
+    data += _names(writer.unit_types)
+    data += _names(writer.effects)
+    data += units
+    return bytes(data)
+
+
+class _Reader(object):
+    def __init__(self, board, data, unit_types, effects):
+        self.board = board
+        self.data = data
+        self.templates = [statreader.template_of('statsheets/' + name) for name in unit_types]
+        self.definitions = [status_effects.definition_of(effect_id) for effect_id in effects]
+        for effect_id, definition in zip(effects, self.definitions):
+            if definition is None:
+                raise SaveFormatError(f'unknown status effect {effect_id}')
+
+    def unit(self, offset):
+        type_id, team, hp, attacks, has_moved, in_progress, build_progress, effect_count, carried_count = \
+            UNIT.unpack_from(self.data, offset)
+        offset += UNIT.size
+        template = self.templates[type_id]
+        player = None if team == NO_PLAYER else self.board.get_player_num(team)
+        # No image: the renderer looks sprites up by the template's image name
+        unit = template.spawn(player, None, bool(in_progress))
+        unit.hp = hp
+        unit.attacks = attacks
+        unit.hasMoved = has_moved
+        if hasattr(unit, 'buildProgress'):
+            unit.buildProgress = build_progress
+        for i in range(effect_count):
+            effect, duration, stacks = EFFECT.unpack_from(self.data, offset)
+            offset += EFFECT.size
+            unit.status_effects.append(Status_Effect(self.definitions[effect], duration, stacks))
+        unit.update_status_modifiers()
+        for i in range(carried_count):
+            carried, offset = self.unit(offset)
+            unit.carrying.append(carried)
+        return unit, offset
+
+
+def unpack(data):
+    """Rebuild a board from bytes made by pack; AI controllers are not part of a save"""
+    (magic, version, width, height, half_turns, seed, acting, click_state, mine_count,
+     type_count, effect_count, tile_count) = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise SaveFormatError('not a saved game')
+    if version != VERSION:
+        raise SaveFormatError(f'saved game format version {version}, expected {VERSION}')
+    offset = HEADER.size
+    players = []
+    for i in range(2):
+        players.append(PLAYER.unpack_from(data, offset))
+        offset += PLAYER.size
+    selection = SELECTION.unpack_from(data, offset)
+    offset += SELECTION.size
+    mine_coords = [COORDS.unpack_from(data, offset + i * COORDS.size) for i in range(mine_count)]
+    offset += mine_count * COORDS.size
+    unit_types, offset = _read_names(data, offset, type_count)
+    effects, offset = _read_names(data, offset, effect_count)
+
+    board = game_board.GameBoard(game_map=maps.GameMap.blank(width, height, mine_coords), seed=seed)
+    board.turn_count = half_turns / 2
+    for team, (money, is_ai) in enumerate(players):
+        board.get_player_num(team).setMoney(money)
+        board.get_player_num(team).setIsAI(bool(is_ai))
+    board.player_acting = board.get_player_num(acting)
+
+    reader = _Reader(board, data, unit_types, effects)
+    for i in range(tile_count):
+        x, y, active = TILE.unpack_from(data, offset)
+        unit, offset = reader.unit(offset + TILE.size)
+        tile = board.tile_at(x, y)
+        tile.addUnit(unit)
+        if active >= 0:
+            tile.set_active_unit(active)
+
+    tiles = [board.tile_at(selection[i], selection[i + 1]) if selection[i] >= 0 else None for i in range(0, 8, 2)]
+    board.selected_tile, board.second_selected_tile, board.targeted_tile, board.building_tile = tiles
+    board.click_state = CLICK_STATES[click_state]
+    if board.click_state == 'producing unit or acting':
+        board.click_state = 'choosing action'
+    board.bump_version()
+    return board
+
+def save(board, path):
+    with open(path, 'wb') as file:
+        file.write(pack(board))
+
+def load(path):
+    with open(path, 'rb') as file:
+        return unpack(file.read())
@@ -0,0 +1,29 @@
+# seeding.py - Reproducible random streams for games, AI controllers and workers
+#
+# Every stream is derived from one master seed plus a label, e.g. ('ai', 1) for
+# player 1's controller or ('worker', 3) for the fourth process of a batch run.
+# Derivation hashes the labels, so a stream does not depend on how many other
+# streams were made before it or in which process.
+import hashlib
+import os
+import random
+
+DEFAULT_SEED = 0
+
+
+def new_seed():
+    """A fresh master seed, for games that do not need to be reproduced"""
+    return int.from_bytes(os.urandom(8), 'little')
+
+def derive_seed(master_seed, *labels):
+    """Seed of the stream named by labels under a master seed"""
+    text = '/'.join(str(part) for part in (master_seed,) + labels)
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def stream(master_seed, *labels):
+    """Independent random.Random for one consumer of a seeded game"""
+    return random.Random(derive_seed(master_seed, *labels))
+
+def worker_seeds(master_seed, count):
+    """Master seeds for parallel workers, one per worker"""
+    return [derive_seed(master_seed, 'worker', index) for index in range(count)]
@@ -2,12 +2,20 @@ import unit
 import pygame
 import os
 import player
+from tag_bits import bit_of
+import status_effects
+import game_log
+
+log = game_log.logger('status')
 
 def getList(fileName):
     file = open(fileName, 'r').read()
     return file.split('\n')
 
-def unitFromStatsheet(statsheet, player, dimensions=20, prebuilt=False):
+# Parsed statsheets, keyed by normalized path, so each file is read from disk once
+templates = {}
+
+def templateFromStatsheet(statsheet):
     statList = getList(statsheet)
     bonuses = statList[9].split('=')[1].split(',')
     bonuses = [tuple(bonus.split(':')) for bonus in bonuses]
@@ -19,27 +27,20 @@ def unitFromStatsheet(statsheet, player, dimensions=20, prebuilt=False):
             multiplier=float(bonus[1]),
             exceptions=exceptions
         ))
-    
-    try:
-        image = pygame.transform.scale(imageColorConverter('statsheets/images/' + statList[11].split('=')[1], player), (dimensions, dimensions))
-    except:
-        image = None
-
-    # Handle status_on_hit parameter (optional, may not exist in older statsheets)
-    status_on_hit = None
-    if len(statList) > 15:  # Check if status_on_hit field exists
-        status_line = statList[15].split('=')
-        if len(status_line) > 1 and status_line[1].strip():
-            status_on_hit = status_line[1].strip()
-
-    # carry capacity from statsheets tries to see if it exists 
-    # if not, it sets to default value
-    try:
-        carry_capacity = int(statList[15].split('=')[1])
-    except:
-        carry_capacity = 0
-        
-    return unit.Unit(
+
+    # Optional fields after the hotkey (carry, status_on_hit), found by key
+    optional = {}
+    for line in statList[15:]:
+        if '=' in line:
+            key, value = line.split('=', 1)
+            optional[key.strip()] = value.strip()
+    carry_capacity = int(optional.get('carry') or 0)
+    status_on_hit = optional.get('status_on_hit') or None
+    if status_on_hit is not None and status_on_hit not in status_effects.STATUS_EFFECTS:
+        log.warning("%s has unknown status effect %s", statsheet, status_on_hit)
+        status_on_hit = None
+
+    return unit.UnitTemplate(
         name=statList[0].split('=')[1],
         attack=int(statList[1].split('=')[1]),
         hp=int(statList[2].split('=')[1]),
@@ -51,60 +52,90 @@ def unitFromStatsheet(statsheet, player, dimensions=20, prebuilt=False):
         damageFalloff=float(statList[8].split('=')[1]),
         bonuses=unit.Bonuses(*bonusesList),
         tags=statList[10].split('=')[1].split(','),
-        image=image,
-        player=player,
         attacks=int(statList[12].split('=')[1]),
         production=int(statList[13].split('=')[1]),
         hotkey=(statList[14].split('=')[1]),
-        inProgress=not(prebuilt),
         carryCapacity = carry_capacity,
-        status_on_hit=status_on_hit
+        status_on_hit=status_on_hit,
+        image_name=statList[11].split('=')[1],
+        statsheet=os.path.basename(statsheet)
     )
 
+def template_of(statsheet):
+    """Get the shared template for a statsheet path, parsing it on first use"""
+    key = os.path.normpath(statsheet)
+    template = templates.get(key)
+    if template is None:
+        template = templateFromStatsheet(statsheet)
+        templates[key] = template
+    return template
+
+def unitFromStatsheet(statsheet, player, dimensions=20, prebuilt=False):
+    template = template_of(statsheet)
+    image = team_sprite(template.image_name, player, dimensions)
+
+    return template.spawn(player=player, image=image, inProgress=not(prebuilt))
+
 def imageColorConverter(image, player):
     try:
         image = pygame.image.load(image).convert_alpha()
 
-        width, height = image.get_width(), image.get_height()
         if player:
             if player.getTeam():
                 colorSet = (255, 0, 0)
             else:
                 colorSet = (0, 100, 255)
-        
-            for x in range(width):
-                for y in range(height):
-                    color = image.get_at((x, y))
-                    if color == (255, 0, 255):
-                        image.set_at((x, y), colorSet)
-    except pygame.error:
+
+            pixels = pygame.PixelArray(image)
+            pixels.replace((255, 0, 255), colorSet)
+            pixels.close()
+    except (pygame.error, OSError):
         return None
     
     return image
 
+# Team-colored sprites keyed by (image, team, size), shared by every unit drawn with them.
+# A size of None holds the unscaled recolor that the scaled sizes are made from.
+# Images that fail to load are kept as None so they are not read again.
+sprites = {}
+
+def team_sprite(image_name, player, dimensions=None):
+    """Get the sprite for an image in a player's team color, recoloring it only once"""
+    # Sprites need a display to convert to; without one, don't touch the disk at all
+    if pygame.display.get_surface() is None:
+        return None
+    team = player.getTeam() if player else None
+    key = (image_name, team, dimensions)
+    if key not in sprites:
+        if dimensions is None:
+            sprites[key] = imageColorConverter('statsheets/images/' + image_name, player)
+        else:
+            original = team_sprite(image_name, player)
+            sprites[key] = pygame.transform.scale(original, (dimensions, dimensions)) if original is not None else None
+    return sprites[key]
+
 testUnits = []
-for statsheetName in os.listdir('statsheets'):
-    if statsheetName != 'images':
-        testUnits.append(unitFromStatsheet('statsheets/' + statsheetName, None))
+for statsheetName in sorted(os.listdir('statsheets')):
+    if os.path.isfile('statsheets/' + statsheetName):
+        testUnits.append(template_of('statsheets/' + statsheetName))
+unit.build_damage_matrix(testUnits)
 
 def units_without_tag(tag):
     unitsWithoutTag = []
     for testUnit in testUnits:
-        if not(tag in testUnit.getTags()):
-            unitsWithoutTag.append(testUnit.getStatsheetName())
+        if not(testUnit.tag_mask & bit_of(tag)):
+            unitsWithoutTag.append(testUnit.statsheet)
     return unitsWithoutTag
 
 def units_with_tag(tag):
     unitsWithTag = []
     for testUnit in testUnits:
-        if tag in testUnit.getTags():
-            unitsWithTag.append(testUnit.getStatsheetName())
+        if testUnit.tag_mask & bit_of(tag):
+            unitsWithTag.append(testUnit.statsheet)
     return unitsWithTag
 
 def cost_of(statsheet):
-    statList = getList('statsheets/' + statsheet)
-    return int(statList[6].split('=')[1])
+    return template_of('statsheets/' + statsheet).cost
 
 def hotkey_of(statsheet):
-    statList = getList('statsheets/' + statsheet)
-    return statList[14].split('=')[1]
\ No newline at end of file
+    return template_of('statsheets/' + statsheet).hotkey
\ No newline at end of file
@@ -1,243 +1,197 @@
-# Enhanced status_effects.py with simplified target restrictions
-
-class Status_Effect(object):
-    def __init__(self, name, target=None, duration=1, duration_stacking=True, stacking=False, 
-                 self_damage=0, attack_change=0, armor_change=0, actions_change=0, 
-                 range_change=0, area_change=0, damage_falloff_change=0, speed_change=0, 
+# Data-driven status effects: immutable definitions loaded from statsheets/effects
+# and a small per-unit state holding only how long and how often each one applies
+import os
+from tag_bits import mask_of, tags_in
+
+# Stat modifiers a status effect can carry, aggregated on each unit
+STAT_MODIFIERS = ('attack_change', 'armor_change', 'actions_change', 'range_change',
+                  'area_change', 'damage_falloff_change', 'speed_change')
+# Modifiers of a unit without status effects; shared, so never modified in place
+NO_MODIFIERS = dict.fromkeys(STAT_MODIFIERS, 0)
+
+EFFECTS_DIRECTORY = 'statsheets/effects'
+
+class Status_Effect_Definition(object):
+    """Immutable description of a status effect, shared by every unit it is applied to"""
+    __slots__ = ('name', 'duration', 'duration_stacking', 'stacking', 'self_damage',
+                 'attack_change', 'armor_change', 'actions_change', 'range_change',
+                 'area_change', 'damage_falloff_change', 'speed_change',
+                 'special_behavior', 'special_behavior_trigger', 'required_tags', 'immunity_tags',
+                 'required_mask', 'immunity_mask', 'modifiers')
+
+    def __init__(self, name, duration=1, duration_stacking=True, stacking=False,
+                 self_damage=0, attack_change=0, armor_change=0, actions_change=0,
+                 range_change=0, area_change=0, damage_falloff_change=0, speed_change=0,
                  special_behavior=None, special_behavior_trigger=None,
                  required_tags=None, immunity_tags=None):
-        self.name = name
-        self.duration = duration
-        self.unit = target
-        self.stacking = stacking
-        self.self_damage = self_damage
-        self.attack_change = attack_change
-        self.armor_change = armor_change
-        self.actions_change = actions_change
-        self.range_change = range_change
-        self.area_change = area_change
-        self.damage_falloff_change = damage_falloff_change
-        self.speed_change = speed_change
-        self.special_behavior = special_behavior
-        self.special_behavior_trigger = special_behavior_trigger
-        self.duration_stacking = duration_stacking
-        
-        # Simplified target restriction system
-        self.required_tags = required_tags or []  # Unit must have at least one of these tags
-        self.immunity_tags = immunity_tags or []   # Units with these tags are immune to this effect
+        values = {
+            'name': name,
+            'duration': duration,
+            'duration_stacking': duration_stacking,
+            'stacking': stacking,
+            'self_damage': self_damage,
+            'attack_change': attack_change,
+            'armor_change': armor_change,
+            'actions_change': actions_change,
+            'range_change': range_change,
+            'area_change': area_change,
+            'damage_falloff_change': damage_falloff_change,
+            'speed_change': speed_change,
+            'special_behavior': special_behavior,
+            'special_behavior_trigger': special_behavior_trigger,
+            # Simplified target restriction system
+            'required_tags': tuple(required_tags or ()),  # Unit must have at least one of these tags
+            'immunity_tags': tuple(immunity_tags or ()),  # Units with these tags are immune to this effect
+            'required_mask': mask_of(required_tags or ()),
+            'immunity_mask': mask_of(immunity_tags or ()),
+        }
+        # Only the stats this effect actually changes, as (stat, change) pairs
+        values['modifiers'] = tuple((stat_name, values[stat_name]) for stat_name in STAT_MODIFIERS if values[stat_name])
+        for field, value in values.items():
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, field, value):
+        raise AttributeError(f'{self.name} definition is read-only')
 
     def can_affect_target(self, target_unit):
         """Check if this status effect can be applied to the target unit"""
-        target_tags = target_unit.getTags()
-        
+        target_mask = target_unit.tag_mask
+
         # Check immunity tags first (highest priority)
-        for immunity_tag in self.immunity_tags:
-            if immunity_tag in target_tags:
-                return False, f"{target_unit.getName()} is immune to {self.name} (has {immunity_tag} tag)"
-        
+        if target_mask & self.immunity_mask:
+            immunity_tag = tags_in(target_mask, self.immunity_tags)[0]
+            return False, f"{target_unit.getName()} is immune to {self.name} (has {immunity_tag} tag)"
+
         # Check required tags
-        if self.required_tags:
-            has_required = any(tag in target_tags for tag in self.required_tags)
-            if not has_required:
-                return False, f"{target_unit.getName()} cannot be affected by {self.name} (missing required tags: {self.required_tags})"
-        
+        if self.required_mask:
+            if not target_mask & self.required_mask:
+                return False, f"{target_unit.getName()} cannot be affected by {self.name} (missing required tags: {list(self.required_tags)})"
+
         return True, "Can apply effect"
 
+
+class Status_Effect(object):
+    """A status effect active on one unit: its definition, turns left and stack count"""
+    __slots__ = ('definition', 'duration', 'stacks')
+
+    def __init__(self, definition, duration=None, stacks=1):
+        self.definition = definition
+        self.duration = definition.duration if duration is None else duration
+        self.stacks = stacks
+
+    def can_affect_target(self, target_unit):
+        return self.definition.can_affect_target(target_unit)
+
     def set_duration(self, value):
         self.duration = value
 
     def add_duration(self, value):
         self.duration += value
 
+    def add_stack(self, duration):
+        """Stack another application, refreshing the duration"""
+        self.stacks += 1
+        self.duration = max(self.duration, duration)
+
     def decrease_duration(self, amount):
         self.duration -= amount
-        if self.duration <= 0 and self.unit:
-            self.unit.remove_status(self)
+
+    def modifier(self, stat_name):
+        """Total change to a stat from all stacks of this effect"""
+        return getattr(self.definition, stat_name) * self.stacks
 
     # All existing getters...
     def get_name(self):
-        return self.name
-    
+        return self.definition.name
+
+    def get_definition(self):
+        return self.definition
+
     def get_duration_stacking(self):
-        return self.duration_stacking
-    
+        return self.definition.duration_stacking
+
     def get_duration(self):
         return self.duration
-    
-    def get_unit(self):
-        return self.unit
-    
+
+    def get_stacks(self):
+        return self.stacks
+
     def get_stacking(self):
-        return self.stacking
-    
+        return self.definition.stacking
+
     def get_self_damage(self):
-        return self.self_damage
-    
+        return self.definition.self_damage
+
     def get_attack_change(self):
-        return self.attack_change
-    
+        return self.modifier('attack_change')
+
     def get_armor_change(self):
-        return self.armor_change
-    
+        return self.modifier('armor_change')
+
     def get_actions_change(self):
-        return self.actions_change
-    
+        return self.modifier('actions_change')
+
     def get_range_change(self):
-        return self.range_change
-    
+        return self.modifier('range_change')
+
     def get_area_change(self):
-        return self.area_change
-    
+        return self.modifier('area_change')
+
     def get_damage_falloff_change(self):
-        return self.damage_falloff_change
-    
+        return self.modifier('damage_falloff_change')
+
     def get_speed_change(self):
-        return self.speed_change
-    
+        return self.modifier('speed_change')
+
     def get_special_behavior(self):
-        return self.special_behavior
-    
+        return self.definition.special_behavior
+
     def get_special_behavior_trigger(self):
-        return self.special_behavior_trigger
+        return self.definition.special_behavior_trigger
 
     # Updated getters for simplified restriction system
     def get_required_tags(self):
-        return self.required_tags
-    
+        return self.definition.required_tags
+
     def get_immunity_tags(self):
-        return self.immunity_tags
-
-
-# Predefined status effects with simplified restrictions
-class PoisonEffect(Status_Effect):
-    def __init__(self, target=None, duration=3):
-        super().__init__(
-            name="Poison",
-            target=target,
-            duration=duration,
-            duration_stacking=False,
-            stacking=True,
-            self_damage=2,
-            required_tags=["alive"],  # Only affects living units
-            immunity_tags=["poison_immune", "construct", "elemental"]
-        )
-
-class ArmorBreakEffect(Status_Effect):
-    def __init__(self, target=None, duration=5):
-        super().__init__(
-            name="Armor Break",
-            target=target,
-            duration=duration,
-            duration_stacking=True,
-            stacking=False,
-            armor_change=-2,
-            immunity_tags=["armor_break_immune", "no_armor", "incorporeal"]  # Combined forbidden into immunity
-        )
-
-class SlowEffect(Status_Effect):
-    def __init__(self, target=None, duration=3):
-        super().__init__(
-            name="Slow",
-            target=target,
-            duration=duration,
-            duration_stacking=True,
-            stacking=False,
-            speed_change=-1,
-            immunity_tags=["slow_immune", "teleporter", "immobile"]  # Can't slow immobile things
-        )
-
-class StunEffect(Status_Effect):
-    def __init__(self, target=None, duration=1):
-        super().__init__(
-            name="Stun",
-            target=target,
-            duration=duration,
-            duration_stacking=False,
-            stacking=False,
-            actions_change=-10,
-            speed_change=-10,
-            required_tags=["alive"],  # Only living things can be stunned
-            immunity_tags=["stun_immune", "mindless", "construct"]
-        )
-
-class BerserkerRageEffect(Status_Effect):
-    def __init__(self, target=None, duration=3):
-        super().__init__(
-            name="Berserker Rage",
-            target=target,
-            duration=duration,
-            duration_stacking=False,
-            stacking=False,
-            attack_change=3,
-            armor_change=-1,
-            actions_change=1,
-            required_tags=["alive"],  # Only living things can go berserk
-            immunity_tags=["rage_immune", "calm", "mindless"]  # Mindless creatures can't rage
-        )
-
-class FreezeEffect(Status_Effect):
-    def __init__(self, target=None, duration=2):
-        super().__init__(
-            name="Freeze",
-            target=target,
-            duration=duration,
-            duration_stacking=True,
-            stacking=False,
-            speed_change=-2,
-            actions_change=-1,
-            immunity_tags=["fire", "freeze_immune", "hot_blooded"]
-        )
-
-class BurnEffect(Status_Effect):
-    def __init__(self, target=None, duration=3):
-        super().__init__(
-            name="Burn",
-            target=target,
-            duration=duration,
-            duration_stacking=True,
-            stacking=True,  # Multiple burns can stack
-            self_damage=1,
-            armor_change=-1,  # Fire weakens armor
-            immunity_tags=["fire_immune", "fire", "burn_immune", "incorporeal"]
-        )
-
-class FearEffect(Status_Effect):
-    def __init__(self, target=None, duration=2):
-        super().__init__(
-            name="Fear",
-            target=target,
-            duration=duration,
-            duration_stacking=False,
-            stacking=False,
-            attack_change=-2,
-            speed_change=-1,
-            required_tags=["alive"],
-            immunity_tags=["fearless", "mindless", "construct"]
-        )
-
-class HealingEffect(Status_Effect):
-    def __init__(self, target=None, duration=3):
-        super().__init__(
-            name="Regeneration",
-            target=target,
-            duration=duration,
-            duration_stacking=True,
-            stacking=False,
-            self_damage=-2,  # Negative damage = healing
-            required_tags=["alive"],
-            immunity_tags=["construct"]  # These can't heal naturally
-        )
-
-class BlessedEffect(Status_Effect):
-    def __init__(self, target=None, duration=4):
-        super().__init__(
-            name="Blessed",
-            target=target,
-            duration=duration,
-            duration_stacking=True,
-            stacking=False,
-            attack_change=1,
-            armor_change=1,
-            required_tags=["alive"],
-            immunity_tags=[]  # These can't be blessed
-        )
\ No newline at end of file
+        return self.definition.immunity_tags
+
+
+# Registry of every known effect, keyed by the id used in statsheets (status_on_hit=poison)
+STATUS_EFFECTS = {}
+
+def register(effect_id, definition):
+    STATUS_EFFECTS[effect_id] = definition
+
+def definition_of(effect_id):
+    """Look up an effect definition by id, or None if it is unknown"""
+    return STATUS_EFFECTS.get(effect_id)
+
+def definitionFromFile(fileName):
+    fields = {}
+    for line in open(fileName, 'r').read().split('\n'):
+        if '=' in line:
+            key, value = line.split('=', 1)
+            fields[key.strip()] = value.strip()
+
+    values = {'name': fields.pop('name')}
+    for key, value in fields.items():
+        if key in ('duration_stacking', 'stacking'):
+            values[key] = value == 'True'
+        elif key in ('required_tags', 'immunity_tags'):
+            values[key] = [tag for tag in value.split(',') if tag]
+        elif key in ('special_behavior', 'special_behavior_trigger'):
+            values[key] = value or None
+        elif key == 'damage_falloff_change':
+            values[key] = float(value)
+        else:
+            values[key] = int(value)
+    return Status_Effect_Definition(**values)
+
+def load_definitions(directory=EFFECTS_DIRECTORY):
+    """Register every effect file in a directory under its file name"""
+    for fileName in sorted(os.listdir(directory)):
+        if fileName.endswith('.txt'):
+            register(fileName[:-4], definitionFromFile(os.path.join(directory, fileName)))
+
+load_definitions()
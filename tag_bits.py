@@ -0,0 +1,26 @@
+# Tags from statsheets and effect files are interned here, one bit each,
+# so a unit's tags are a single int and tag tests are bitwise operations
+
+# tag name -> bit
+TAG_BITS = {}
+
+def bit_of(tag):
+    """Bit of a tag, registering tags the first time they are seen"""
+    bit = TAG_BITS.get(tag)
+    if bit is None:
+        bit = 1 << len(TAG_BITS)
+        TAG_BITS[tag] = bit
+    return bit
+
+def mask_of(tags):
+    """Bitmask of a collection of tag names"""
+    if isinstance(tags, str):
+        tags = (tags,)
+    mask = 0
+    for tag in tags:
+        mask |= bit_of(tag)
+    return mask
+
+def tags_in(mask, tags):
+    """The tags from a collection whose bits are set in mask, in order"""
+    return [tag for tag in tags if mask & bit_of(tag)]
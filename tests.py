@@ -1,4 +1,19 @@
 import main
+import game_board
+import status_effects
+import unit
+import game_log
+import maps
+import savegame
+import replay
+import board_renderer
+from colors import COLORS
+import ai
+import seeding
+import benchmarks
+import json
+import os
+import tempfile
 import unittest
 
 
@@ -23,5 +38,238 @@ class TestDamage(unittest.TestCase):
         game.nextTurn()
         self.assertEqual(game.getPlayerNum(1).getMoney(), 6)
 
+class TestDamageMatrix(unittest.TestCase):
+    def testMatrixMatchesBonuses(self):
+        units = [template.spawn() for template in main.statreader.testUnits]
+        for attacker in units:
+            for defender in units:
+                self.assertEqual(attacker.multiplierAgainst(defender), attacker.bonuses.bonusAgainst(defender))
+    def testAdHocUnit(self):
+        knight = main.statreader.template_of('statsheets/Knight.txt').spawn()
+        target = unit.Unit(tags=['infantry'])
+        self.assertEqual(knight.damageTo(target), knight.getAttack() * knight.bonuses.bonusAgainst(target))
+
+class TestIncome(unittest.TestCase):
+    def testLedgerFollowsUnits(self):
+        game = game_board.GameBoard()
+        player = game.get_player_num(0)
+        game.initialize_unit(1, 1, 'statsheets/Farm.txt', 0, prebuilt=True)
+        farm = game.tile_at(1, 1).get_unit()
+        self.assertEqual(game.projected_income(player), farm.getProduction())
+        x, y = game_board.mines.mineCoords[0]
+        game.initialize_unit(x, y, 'statsheets/Knight.txt', 0, prebuilt=True)
+        self.assertEqual(game.projected_income(player), farm.getProduction() + 1)
+        game.tile_at(1, 1).removeUnit()
+        self.assertEqual(game.projected_income(player), 1)
+        game.tile_at(x, y).get_unit().setPlayer(game.get_player_num(1))
+        self.assertEqual(game.projected_income(player), 0)
+
+class TestBoardStorage(unittest.TestCase):
+    def testOnlyOccupiedTilesStored(self):
+        game = game_board.GameBoard(width=1000, height=1000)
+        game.initialize_unit(900, 700, 'statsheets/Knight.txt', 0, prebuilt=True)
+        square = game.tile_at(900, 700)
+        self.assertIs(game.tile_at(900, 700), square)
+        self.assertEqual(len(game.storage.chunks), 1)
+        self.assertEqual(list(game.get_units()), [square.get_unit()])
+        square.removeUnit()
+        self.assertEqual(game.storage.chunks, {})
+        self.assertEqual(game.occupied_tiles(), [])
+
+class TestMaps(unittest.TestCase):
+    def testMapRoundTrip(self):
+        units = [maps.StartingUnit(4, 0, 'Farm.txt', 0, prebuilt=True), maps.StartingUnit(5, 19, 'Farm.txt', 1)]
+        game_map = maps.GameMap(maps.pack(10, 20, objectives=[(3, 8), (6, 11)], units=units))
+        self.assertEqual(game_map.objective_coords(), [(3, 8), (6, 11)])
+        game = game_board.GameBoard(game_map=game_map)
+        game.place_starting_units()
+        self.assertEqual(game.tile_at(4, 0).get_unit().getName(), 'farm')
+        self.assertFalse(game.tile_at(4, 0).get_unit().is_under_construction())
+        self.assertEqual(game.tile_at(5, 19).get_unit().getPlayer(), game.get_player_num(1))
+        self.assertTrue(game.tile_at(5, 19).get_unit().is_under_construction())
+    def testCastleMapFile(self):
+        game_map = maps.GameMap.open(maps.DEFAULT_MAP)
+        try:
+            self.assertEqual((game_map.width, game_map.height), (10, 20))
+            self.assertEqual(sorted(game_map.objective_coords()), sorted(game_board.mines.mineCoords))
+        finally:
+            game_map.close()
+
+class TestSaveGame(unittest.TestCase):
+    def testRoundTrip(self):
+        game = game_board.GameBoard()
+        game.initialize_unit(5, 1, 'statsheets/Knight.txt', 0, prebuilt=True)
+        game.initialize_unit(4, 3, 'statsheets/Farm.txt', 1)
+        knight = game.tile_at(5, 1).get_unit()
+        knight.hp -= 3
+        knight.add_status_effect(status_effects.definition_of('poison'))
+        knight.addCarried(main.statreader.template_of('statsheets/Archer.txt').spawn(game.get_player_num(0)))
+        game.get_player_num(1).setMoney(17)
+        game.next_turn()
+        data = savegame.pack(game)
+        loaded = savegame.unpack(data)
+        self.assertEqual(savegame.pack(loaded), data)
+        loaded_knight = loaded.tile_at(5, 1).get_unit()
+        self.assertEqual(loaded_knight.getHp(), knight.getHp())
+        self.assertEqual(loaded_knight.status_effects[0].get_duration(), knight.status_effects[0].get_duration())
+        self.assertEqual(loaded_knight.carrying[0].getName(), 'archer')
+        self.assertTrue(loaded.tile_at(4, 3).get_unit().is_under_construction())
+        self.assertEqual(loaded.get_player_acting(), loaded.get_player_num(1))
+        self.assertEqual(loaded.get_player_num(1).getMoney(), game.get_player_num(1).getMoney())
+
+class TestReplay(unittest.TestCase):
+    def testSeekMatchesRecordedGame(self):
+        path = os.path.join(tempfile.mkdtemp(), 'game.replay')
+        game = game_board.GameBoard()
+        game.initialize_unit(5, 5, 'statsheets/Knight.txt', 0, prebuilt=True)
+        game.initialize_unit(5, 9, 'statsheets/Castle.txt', 1, prebuilt=True)
+        recorder = replay.ReplayRecorder(path, interval=2)
+        game.record_to(recorder)
+        snapshots = {game.get_turn(): savegame.pack(game)}
+        for y in (6, 7, 8):
+            game.move(game.tile_at(5, y - 1), game.tile_at(5, y))
+            game.attack(game.tile_at(5, y), game.tile_at(5, 9))
+            game.next_turn()
+            game.next_turn()
+            snapshots[game.get_turn()] = savegame.pack(game)
+        recorder.close()
+        reader = replay.ReplayReader(path)
+        try:
+            self.assertEqual([turn for turn, offset in reader.keyframes], [2, 6])
+            for turn, snapshot in snapshots.items():
+                self.assertEqual(savegame.pack(reader.seek(turn)), snapshot)
+        finally:
+            reader.close()
+
+class TestSeeding(unittest.TestCase):
+    def selfPlay(self, seed, turns=10):
+        game_map = maps.GameMap.open(maps.DEFAULT_MAP)
+        try:
+            game = game_board.GameBoard(game_map=game_map, seed=seed)
+            game.place_starting_units()
+            # Controllers are driven directly; registered ones would start each other's turns
+            controllers = {}
+            for team in (0, 1):
+                player = game.get_player_num(team)
+                controllers[player] = ai.HeuristicAI(player, game.random_stream('ai', team), game.mine_coords)
+            for i in range(turns):
+                controllers[game.get_player_acting()].take_turn(game)
+            return savegame.pack(game)
+        finally:
+            game_map.close()
+    def testSameSeedSameGame(self):
+        self.assertEqual(self.selfPlay(7), self.selfPlay(7))
+    def testSeedSaved(self):
+        game = game_board.GameBoard(seed=12345)
+        loaded = savegame.unpack(savegame.pack(game))
+        self.assertEqual(loaded.seed, 12345)
+        self.assertEqual([loaded.random_stream('ai', 1).random() for i in range(3)],
+                         [game.random_stream('ai', 1).random() for i in range(3)])
+    def testStreamsIndependent(self):
+        self.assertEqual(seeding.stream(7, 'ai', 1).random(), seeding.stream(7, 'ai', 1).random())
+        self.assertNotEqual(seeding.stream(7, 'ai', 0).random(), seeding.stream(7, 'ai', 1).random())
+        self.assertEqual(len(set(seeding.worker_seeds(7, 4))), 4)
+
+class TestBenchmarks(unittest.TestCase):
+    def testEngineResultsAreJson(self):
+        engine = benchmarks.bench_engine(10, 20, 0.2, repeat=1)
+        self.assertEqual(engine['units'], len(benchmarks.populated_board(10, 20, 0.2).occupied_tiles()))
+        self.assertIn('ai_take_turn', engine['results'])
+        json.dumps(engine)
+
+class TestRenderer(unittest.TestCase):
+    def setUp(self):
+        self.game = game_board.GameBoard()
+        self.game.initialize_unit(5, 5, 'statsheets/Knight.txt', 0, prebuilt=True)
+        self.game.initialize_unit(5, 8, 'statsheets/Castle.txt', 1, prebuilt=True)
+        self.renderer = board_renderer.BoardRenderer(self.game, 20)
+        self.renderer.update_all()
+    def select(self, x, y):
+        self.game.selected_tile = self.game.tile_at(x, y)
+        self.game.click_state = 'choosing action'
+        self.renderer.update_all()
+        return dict(self.renderer.highlight_outlines)
+    def testDirtyRects(self):
+        game, renderer = self.game, self.renderer
+        self.assertEqual(renderer.update_all(), [])
+        game.move(game.tile_at(5, 5), game.tile_at(5, 7))
+        self.assertNotEqual(renderer.update_all(), [])
+        self.assertEqual(renderer.update_all(), [])
+        game.attack(game.tile_at(5, 7), game.tile_at(5, 8))
+        self.assertNotEqual(renderer.update_all(), [])
+        self.assertEqual(renderer.update_all(), [])
+        game.next_turn()
+        self.assertNotEqual(renderer.update_all(), [])
+        self.assertEqual(renderer.update_all(), [])
+    def testHighlightsFollowBoard(self):
+        game = self.game
+        before = self.select(5, 5)
+        self.assertIn(game.tile_at(5, 6), before)
+        # Same selection, new board version: a unit now blocks the way
+        game.initialize_unit(5, 6, 'statsheets/Wall.txt', 1, prebuilt=True)
+        self.renderer.update_all()
+        self.assertNotEqual(self.renderer.highlight_outlines, before)
+        self.assertNotEqual(self.renderer.highlight_outlines.get(game.tile_at(5, 6)), before[game.tile_at(5, 6)])
+        # The selected unit moving away leaves no moves to highlight from its old tile
+        game.move(game.tile_at(5, 5), game.tile_at(4, 5))
+        self.renderer.update_all()
+        self.assertNotIn(COLORS.LBLUE, self.renderer.highlight_outlines.values())
+
+class TestTags(unittest.TestCase):
+    def testTagMasks(self):
+        knight = main.statreader.template_of('statsheets/Knight.txt').spawn()
+        for tag in knight.getTags():
+            self.assertTrue(knight.hasTag(tag))
+        self.assertFalse(knight.hasTag('structure'))
+    def testBonusExceptions(self):
+        bonus = unit.Bonus(['infantry', 'fast'], 1.5, ['fast'])
+        self.assertEqual(bonus.bonusAgainst(unit.Unit(tags=['infantry'])), 1.5)
+        self.assertEqual(bonus.bonusAgainst(unit.Unit(tags=['fast'])), 1)
+
+class TestStatusEffects(unittest.TestCase):
+    def testStackingPoison(self):
+        game = game_board.GameBoard()
+        game.initialize_unit(5, 1, 'statsheets/Poison Archer.txt', 0)
+        game.initialize_unit(5, 3, 'statsheets/Knight.txt', 1)
+        archer, knight = game.tile_at(5, 1).get_unit(), game.tile_at(5, 3).get_unit()
+        archer.apply_status_on_hit(knight)
+        archer.apply_status_on_hit(knight)
+        self.assertEqual(len(knight.status_effects), 1)
+        self.assertEqual(knight.status_effects[0].get_stacks(), 2)
+        knight.process_status_effects()
+        self.assertEqual(knight.getHp(), knight.getMaxHp() - 2)
+    def testModifiersExpire(self):
+        game = game_board.GameBoard()
+        game.initialize_unit(5, 3, 'statsheets/Knight.txt', 1)
+        knight = game.tile_at(5, 3).get_unit()
+        armor = knight.getArmor()
+        knight.add_status_effect(status_effects.definition_of('armor_break'))
+        self.assertEqual(knight.getArmor(), max(0, armor - 2))
+        for i in range(5):
+            knight.process_status_effects()
+        self.assertEqual(knight.getArmor(), armor)
+        self.assertEqual(knight.status_effects, [])
+    def testEventsLogged(self):
+        buffer = game_log.log_to_ring_buffer()
+        try:
+            knight = main.statreader.template_of('statsheets/Knight.txt').spawn()
+            knight.add_status_effect(status_effects.definition_of('poison'))
+        finally:
+            game_log.log_to_nothing()
+        self.assertIn('Poison applied to knight for 3 turns', buffer.messages())
+    def testWarningsRoute(self):
+        game_log.log_warnings()
+        try:
+            ai_log = game_log.logger('ai')
+            self.assertTrue(ai_log.isEnabledFor(game_log.logging.WARNING))
+            self.assertFalse(ai_log.isEnabledFor(game_log.logging.INFO))
+        finally:
+            game_log.log_to_nothing()
+    def testOptionalStatsheetFields(self):
+        archer = main.statreader.template_of('statsheets/Archer.txt')
+        self.assertEqual(archer.status_on_hit, None)
+        self.assertEqual(archer.carryCapacity, 5)
+        self.assertEqual(main.statreader.template_of('statsheets/Poison Archer.txt').status_on_hit, 'poison')
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,6 +1,8 @@
 from colors import COLORS
 
 class Tile(object):
+    __slots__ = ('x', 'y', 'outline', 'unit', 'activeUnit', 'ledger', 'storage', '__weakref__')
+
     def __init__(self, x, y, outline=COLORS.BLACK, unit=None):
         self.x = x
         self.y = y
@@ -8,6 +10,9 @@ class Tile(object):
         self.unit = unit
         # active unit is for movement calculation (so a carried troop can move out of another troop)
         self.activeUnit = unit
+        # IncomeLedger and board storage told whenever the unit on this tile changes
+        self.ledger = None
+        self.storage = None
 
     def getCords(self):
         return (self.x, self.y)
@@ -17,6 +22,10 @@ class Tile(object):
 
     def removeUnit(self):
         self.unit = None
+        if self.storage:
+            self.storage.occupant_changed(self)
+        if self.ledger:
+            self.ledger.refresh(self)
 
     def damageUnit(self, damage):
         if self.unit.takeDamage(damage):
@@ -57,6 +66,10 @@ class Tile(object):
         self.unit = unit
         self.activeUnit = unit
         self.unit.set_tile(self)
+        if self.storage:
+            self.storage.occupant_changed(self)
+        if self.ledger:
+            self.ledger.refresh(self)
 
     def getOutline(self):
         return self.outline
@@ -77,7 +90,7 @@ class Tile(object):
             return None
     
     def set_active_unit(self, carriedIndex):
-        self.ActiveUnit = self.get_unit().carried[carriedIndex]
+        self.activeUnit = self.get_unit().carrying[carriedIndex]
 
     def get_active_unit(self):
         return self.activeUnit
@@ -2,208 +2,274 @@ import pygame
 import math
 from bonuses import *
 from status_effects import *
-import healthbars
+from tag_bits import bit_of, mask_of
+import game_log
+
+log = game_log.logger('status')
+
+OBSTRUCTS_MOVEMENT = bit_of('obstructs movement')
+PRODUCED_BY_BUILDER = bit_of('produced by builder')
+
+class UnitTemplate(object):
+    """Immutable static stats shared by every unit of one type"""
+    __slots__ = ('name', 'maxAttacks', 'attack', 'maxHp', 'armor', 'speed', 'range', 'cost',
+                 'area', 'damageFalloff', 'bonuses', 'tags', 'carryCapacity', 'production',
+                 'hotkey', 'buildCost', 'status_on_hit', 'image_name', 'statsheet', 'tag_mask')
+
+    def __init__(self, name='None', attacks=1, attack=5, hp=10, armor=0, speed=3, range=1,
+                 cost=2, area=0, damageFalloff=0, bonuses=Bonuses(), tags='none',
+                 carryCapacity=0, production=0, hotkey='-', buildcost=False,
+                 status_on_hit=None, image_name=None, statsheet=None):
+        values = {
+            'name': name,
+            'maxAttacks': attacks,
+            'attack': attack,
+            'maxHp': hp,
+            'armor': armor,
+            'speed': speed,
+            'range': range,
+            'cost': cost,
+            'area': area,
+            'damageFalloff': damageFalloff,
+            'bonuses': bonuses,
+            'tags': tuple(tags) if isinstance(tags, list) else tags,
+            'carryCapacity': carryCapacity,
+            'production': production,
+            'hotkey': hotkey,
+            'buildCost': buildcost if buildcost else cost,
+            'status_on_hit': status_on_hit,
+            'image_name': image_name,
+            'statsheet': statsheet if statsheet else f'{name.title()}.txt',
+            'tag_mask': mask_of(tags),
+        }
+        for field, value in values.items():
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, field, value):
+        raise AttributeError(f'{self.name} template is read-only')
+
+    def spawn(self, player=0, image=None, inProgress=True):
+        """Create a unit of this type holding only the per-unit mutable state"""
+        return Unit(template=self, player=player, image=image, inProgress=inProgress)
+
+
+# (attacker template, defender template) -> bonus multiplier, for every statsheet unit type
+DAMAGE_MULTIPLIERS = {}
+
+def build_damage_matrix(templates):
+    """Precompute the bonus multiplier of every attacker type against every defender type"""
+    for attacker in templates:
+        for defender in templates:
+            DAMAGE_MULTIPLIERS[(attacker, defender)] = attacker.bonuses.bonusAgainst(defender)
+
+
+def _template_field(field):
+    return property(lambda self: getattr(self.template, field))
+
 
 class Unit(object):
+    # Per-unit mutable state; everything else is read from the template
+    __slots__ = ('template', 'attacks', 'hp', 'image', 'hasMoved', 'player', 'carrying',
+                 'status_effects', 'status_modifiers', 'original_image', 'buildProgress',
+                 'inProgress', 'buildCost', 'tile')
+
+    # Static stats live on the shared template
+    name = _template_field('name')
+    maxAttacks = _template_field('maxAttacks')
+    maxHp = _template_field('maxHp')
+    attack = _template_field('attack')
+    armor = _template_field('armor')
+    speed = _template_field('speed')
+    area = _template_field('area')
+    range = _template_field('range')
+    cost = _template_field('cost')
+    damageFalloff = _template_field('damageFalloff')
+    bonuses = _template_field('bonuses')
+    tags = _template_field('tags')
+    tag_mask = _template_field('tag_mask')
+    production = _template_field('production')
+    hotkey = _template_field('hotkey')
+    carryCapacity = _template_field('carryCapacity')
+    status_on_hit = _template_field('status_on_hit')
+
     def __init__(self, name='None', attacks=1, attack=5, hp=10, armor=0, speed=3, range=1, 
                  cost=2, area=0, damageFalloff=0, bonuses=Bonuses(), tags='none', 
                  carryCapacity=0, production=0, image=None, player=0, hotkey='-', 
-                 inProgress=True, buildcost=False, status_on_hit=None, tile=None):
-        self.name = name
-        self.maxAttacks = attacks
-        self.attacks = self.maxAttacks
-        self.maxHp = hp
-        self.hp = hp
-        self.attack = attack
-        self.armor = armor
-        self.speed = speed
-        self.area = area
-        self.range = range
-        self.cost = cost
+                 inProgress=True, buildcost=False, status_on_hit=None, tile=None, template=None):
+        if template is None:
+            template = UnitTemplate(name, attacks, attack, hp, armor, speed, range,
+                                    cost, area, damageFalloff, bonuses, tags,
+                                    carryCapacity, production, hotkey, buildcost, status_on_hit)
+        self.template = template
+        self.attacks = template.maxAttacks
+        self.hp = template.maxHp
         self.image = image
-        self.damageFalloff = damageFalloff
         self.hasMoved = 0
         self.player = player
-        self.bonuses = bonuses
-        self.tags = tags
-        self.image = image
-        self.production = production
-        self.hotkey = hotkey
-        self.carryCapacity = carryCapacity
         self.carrying = [] # stores units that are being carried
         self.status_effects = []  # List to store active status effects
-        self.status_on_hit = status_on_hit  # Status effect to apply when attacking
+        self.status_modifiers = NO_MODIFIERS  # Summed stat changes of status_effects
         self.original_image = image  # Store original image for reference to keep resizing clean
-        self.healthbar = healthbars.Healthbar(self)
+        self.tile = tile
         
-        if 'produced by builder' in self.tags:
+        if template.tag_mask & PRODUCED_BY_BUILDER:
             self.buildProgress = 1
             self.inProgress = inProgress
-            if buildcost:
-                self.buildCost = buildcost
-            else:
-                self.buildCost = self.cost
+            self.buildCost = template.buildCost
         else:
             self.inProgress = False
 
+    def get_template(self):
+        return self.template
+
     def get_x(self):
         return self.tile.get_x()
     
-    def get_healthbar(self):
-        return self.healthbar
-    
     def get_y(self):
         return self.tile.get_y()
 
-    def add_status_effect(self, status_effect):
-        """Add a status effect to the unit"""
+    def add_status_effect(self, definition, duration=None):
+        """Apply a status effect definition to the unit"""
         # Check if this status effect can affect this unit
-        can_affect, reason = status_effect.can_affect_target(self)
+        can_affect, reason = definition.can_affect_target(self)
         if not can_affect:
-            print(f"Status effect blocked: {reason}")
+            log.debug("Status effect blocked: %s", reason)
             return False
         
-        status_effect.unit = self  # Set the target unit
-        
+        if duration is None:
+            duration = definition.duration
+
         # Check if effect already exists and handle stacking
         existing_effect = None
         for effect in self.status_effects:
-            if effect.get_name() == status_effect.get_name():
+            if effect.get_definition() is definition:
                 existing_effect = effect
                 break
         
         if existing_effect:
-            if status_effect.get_stacking():
-                # Allow multiple instances of the same effect
-                self.status_effects.append(status_effect)
-            elif status_effect.get_duration_stacking():
+            if definition.stacking:
+                # Stack another application of the same effect
+                existing_effect.add_stack(duration)
+            elif definition.duration_stacking:
                 # Add duration to existing effect
-                existing_effect.add_duration(status_effect.get_duration())
+                existing_effect.add_duration(duration)
             else:
                 # Replace existing effect
-                self.status_effects.remove(existing_effect)
-                self.status_effects.append(status_effect)
+                existing_effect.stacks = 1
+                existing_effect.set_duration(duration)
         else:
             # No existing effect, just add it
-            self.status_effects.append(status_effect)
+            self.status_effects.append(Status_Effect(definition, duration))
+        self.update_status_modifiers()
         
-        print(f"{status_effect.get_name()} applied to {self.name} for {status_effect.get_duration()} turns")
+        log.info("%s applied to %s for %d turns", definition.name, self.name, duration)
         return True
 
     def remove_status(self, status):
         """Remove a specific status effect"""
         if status in self.status_effects:
             self.status_effects.remove(status)
+            self.update_status_modifiers()
 
     def remove_status_by_name(self, effect_name):
         """Remove all status effects with the given name"""
         self.status_effects = [effect for effect in self.status_effects if effect.get_name() != effect_name]
+        self.update_status_modifiers()
 
     def get_status_effect_total(self, stat_name):
         """Calculate the total modifier for a given stat from all active status effects"""
         total = 0
         for effect in self.status_effects:
-            if hasattr(effect, stat_name):
-                total += getattr(effect, stat_name)
+            total += effect.modifier(stat_name)
         return total
 
+    def update_status_modifiers(self):
+        """Re-aggregate the stat modifiers after status effects were added or removed"""
+        if not self.status_effects:
+            self.status_modifiers = NO_MODIFIERS
+        else:
+            modifiers = dict(NO_MODIFIERS)
+            for effect in self.status_effects:
+                for stat_name, change in effect.definition.modifiers:
+                    modifiers[stat_name] += change * effect.stacks
+            self.status_modifiers = modifiers
+
     def process_status_effects(self):
         """Process all status effects for one turn"""
-        effects_to_remove = []
-        
+        if not self.status_effects:
+            return self.hp <= 0
+
+        # Modifiers only change once expired effects are removed, so armor is fixed for the tick
+        armor = self.getArmor()
+        expired = False
         for effect in self.status_effects:
-            # Apply self damage/healing if any
-            if effect.get_self_damage() != 0:
-                if effect.get_self_damage() > 0:  # Damage
-                    damage_taken = max(1, effect.get_self_damage() - self.getArmor())
-                    self.hp -= damage_taken
-                    print(f"{self.name} takes {damage_taken} {effect.get_name()} damage!")
-                else:  # Healing (negative damage)
-                    healing = abs(effect.get_self_damage())
-                    old_hp = self.hp
-                    self.hp = min(self.maxHp, self.hp + healing)
-                    actual_healing = self.hp - old_hp
-                    if actual_healing > 0:
-                        print(f"{self.name} heals {actual_healing} HP from {effect.get_name()}!")
-            
-            # Decrement duration
-            effect.decrease_duration(1)
-            
-            # Mark for removal if expired
-            if effect.get_duration() <= 0:
-                effects_to_remove.append(effect)
-        
-        # Remove expired effects
-        for effect in effects_to_remove:
-            self.remove_status(effect)
-            print(f"{effect.get_name()} effect expired on {self.name}")
+            # Apply self damage/healing if any, once per stack
+            self_damage = effect.definition.self_damage
+            if self_damage > 0:  # Damage
+                damage_taken = max(1, self_damage - armor) * effect.stacks
+                self.hp -= damage_taken
+                log.info("%s takes %d %s damage", self.name, damage_taken, effect.get_name())
+            elif self_damage < 0:  # Healing (negative damage)
+                old_hp = self.hp
+                self.hp = min(self.maxHp, self.hp - self_damage * effect.stacks)
+                if self.hp > old_hp:
+                    log.info("%s heals %d HP from %s", self.name, self.hp - old_hp, effect.get_name())
+
+            effect.duration -= 1
+            if effect.duration <= 0:
+                expired = True
+                log.debug("%s effect expired on %s", effect.get_name(), self.name)
+
+        # Remove expired effects, re-aggregating the modifiers once
+        if expired:
+            self.status_effects = [effect for effect in self.status_effects if effect.duration > 0]
+            self.update_status_modifiers()
         
         # Check if unit died from status effects
         if self.hp <= 0:
-            print(f"{self.name} died from status effects!")
+            log.info("%s died from status effects", self.name)
             return True  # Indicate unit death
         return False
 
     def apply_status_on_hit(self, target):
         """Apply this unit's on-hit status effect to target"""
         if self.status_on_hit and hasattr(target, 'add_status_effect'):
-            # Create a new instance of the status effect for the target
-            effect = None
-            if self.status_on_hit == "poison":
-                effect = PoisonEffect(target=target)
-            elif self.status_on_hit == "armor_break":
-                effect = ArmorBreakEffect(target=target)
-            elif self.status_on_hit == "slow":
-                effect = SlowEffect(target=target)
-            elif self.status_on_hit == "stun":
-                effect = StunEffect(target=target)
-            elif self.status_on_hit == "berserker_rage":
-                effect = BerserkerRageEffect(target=target)
-            elif self.status_on_hit == "freeze":
-                effect = FreezeEffect(target=target)
-            elif self.status_on_hit == "burn":
-                effect = BurnEffect(target=target)
-            elif self.status_on_hit == "fear":
-                effect = FearEffect(target=target)
-            elif self.status_on_hit == "regeneration":
-                effect = HealingEffect(target=target)
-            elif self.status_on_hit == "blessed":
-                effect = BlessedEffect(target=target)
-            else:
-                print(f"Unknown status effect: {self.status_on_hit}")
+            definition = definition_of(self.status_on_hit)
+            if definition is None:
+                log.debug("Unknown status effect: %s", self.status_on_hit)
                 return False
             
             # Try to apply the effect (will check restrictions)
-            success = target.add_status_effect(effect)
+            success = target.add_status_effect(definition)
             if success:
-                print(f"{self.name} applies {effect.get_name()} to {target.getName()}!")
+                log.debug("%s applies %s to %s", self.name, definition.name, target.getName())
             return success
         return False
 
     # Modified getters to include status effect modifiers
     def getRange(self):
-        return max(0, self.range + self.get_status_effect_total('range_change'))
+        return max(0, self.range + self.status_modifiers['range_change'])
     
     def getAttacks(self):
-        return max(0, self.attacks + self.get_status_effect_total('actions_change'))
+        return max(0, self.attacks + self.status_modifiers['actions_change'])
 
     def getAttack(self):
-        return max(0, self.attack + self.get_status_effect_total('attack_change'))
+        return max(0, self.attack + self.status_modifiers['attack_change'])
 
     def getArmor(self):
-        return max(0, self.armor + self.get_status_effect_total('armor_change'))
+        return max(0, self.armor + self.status_modifiers['armor_change'])
 
     def getSpeed(self):
         if self.hasMoved:
             return 0
         else:
-            return max(0, self.speed + self.get_status_effect_total('speed_change'))
+            return max(0, self.speed + self.status_modifiers['speed_change'])
 
     def getArea(self):
-        return max(0, self.area + self.get_status_effect_total('area_change'))
+        return max(0, self.area + self.status_modifiers['area_change'])
 
     def getDamageFalloff(self):
-        return max(0, self.damageFalloff + self.get_status_effect_total('damage_falloff_change'))
+        return max(0, self.damageFalloff + self.status_modifiers['damage_falloff_change'])
 
     # Status effect utility methods
     def has_status_effect(self, effect_name):
@@ -217,7 +283,8 @@ class Unit(object):
         
         effects_str = []
         for effect in self.status_effects:
-            effects_str.append(f"{effect.get_name()}({effect.get_duration()})")
+            stacks = f" x{effect.get_stacks()}" if effect.get_stacks() > 1 else ""
+            effects_str.append(f"{effect.get_name()}{stacks}({effect.get_duration()})")
         
         return ", ".join(effects_str)
 
@@ -235,6 +302,12 @@ class Unit(object):
         self.buildProgress += 1
         if self.buildProgress == self.cost:
             self.inProgress = False
+            self.income_changed()
+
+    def income_changed(self):
+        """Tell the income ledger of the tile this unit stands on to recount it"""
+        if self.tile is not None and self.tile.unit is self and self.tile.ledger:
+            self.tile.ledger.refresh(self.tile)
     
     def getProduction(self):
         return self.production
@@ -245,6 +318,9 @@ class Unit(object):
     def getTags(self):
         return self.tags
 
+    def hasTag(self, tag):
+        return bool(self.tag_mask & bit_of(tag))
+
     def getBonuses(self):
         return self.bonuses
 
@@ -257,19 +333,25 @@ class Unit(object):
     def takeDamage(self, damage):
         self.hp -= max(round(damage) - self.getArmor(), 1)
         if self.hp <= 0:
-            del self.healthbar
             return True
         else:
             return False
 
     def getStatsheetName(self):
-        return f'{self.name.title()}.txt'
+        return self.template.statsheet
+
+    def multiplierAgainst(self, target):
+        multiplier = DAMAGE_MULTIPLIERS.get((self.template, target.template))
+        if multiplier is None:
+            # Units built without a statsheet are not in the matrix
+            multiplier = self.bonuses.bonusAgainst(target)
+        return multiplier
 
     def damageTo(self, target):
-        return self.getAttack() * self.bonuses.bonusAgainst(target)
+        return self.getAttack() * self.multiplierAgainst(target)
 
     def moveThroughable(self, player):
-        if self.player == player and not('obstructs movement' in self.tags):
+        if self.player == player and not(self.tag_mask & OBSTRUCTS_MOVEMENT):
             return True
         else:
             return False
@@ -308,6 +390,7 @@ class Unit(object):
         
     def setPlayer(self, player):
         self.player = player
+        self.income_changed()
         
     def set_image(self, image: pygame.image) -> None:
         self.image = image